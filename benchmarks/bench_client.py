@@ -0,0 +1,185 @@
+"""
+benchmarks of the client, the command stack and the websocket listener
+"""
+import asyncio
+import collections
+import statistics
+import time
+
+import pytest
+
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.commandstack import PRIORITY_INTERACTIVE
+from pydigitalstrom.websocket import DSWebsocketEventListener
+
+# latency of the fake server in seconds, a real dSS answers in 10-100 ms
+LATENCY = 0.005
+
+
+def create_client(dss, **kwargs) -> DSClient:
+    return DSClient(
+        host="127.0.0.1", port=dss.port, apptoken="apptoken", apartment_name="Apartment", **kwargs
+    )
+
+
+def percentile(values: list, percent: int) -> float:
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+@pytest.mark.parametrize("zones", [10, 50, 200])
+def bench_initialize(fake_dss, record, zones):
+    """
+    time to discover the topology of an apartment
+    """
+
+    async def run():
+        dss = await fake_dss(zones=zones, meters=4, latency=LATENCY).start()
+        try:
+            durations = []
+            for _ in range(3):
+                client = create_client(dss)
+                requests = dss.requests
+                started = time.perf_counter()
+                await client.initialize()
+                durations.append(time.perf_counter() - started)
+                await client.close()
+            return durations, dss.requests - requests, len(client.get_scenes())
+        finally:
+            await dss.stop()
+
+    durations, requests, scenes = asyncio.run(run())
+    record(seconds=min(durations), median_seconds=statistics.median(durations), requests=requests, scenes=scenes)
+
+
+async def send_commands(fake_dss, limiter: dict, commands: int, zones: int):
+    """
+    send scenes to the zones through the command stack
+
+    :return: seconds all commands took, latencies of the commands and the
+        interval of the rate limiter afterwards
+    """
+    dss = await fake_dss(zones=zones, latency=LATENCY).start()
+    client = create_client(dss, **limiter)
+    await client.stack.start()
+    try:
+        async def send(number):
+            started = time.perf_counter()
+            zone = number % zones + 1
+            await client.stack.submit(
+                url=f"/json/zone/callScene?id={zone}&sceneNumber=5&force=true",
+                priority=PRIORITY_INTERACTIVE,
+                lane=zone,
+            )
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*[send(number) for number in range(commands)])
+        return time.perf_counter() - started, latencies, client.stack.limiter.interval
+    finally:
+        await client.stack.stop()
+        await client.close()
+        await dss.stop()
+
+
+@pytest.mark.parametrize(
+    "limiter,commands",
+    [
+        # production defaults, measures the adaptive rate limiting
+        (dict(), 20),
+        # rate limiting out of the way, measures the stack overhead
+        (dict(stack_delay=1, stack_min_delay=1, stack_burst=1000), 500),
+    ],
+    ids=["default", "unthrottled"],
+)
+def bench_command_stack(fake_dss, record, limiter, commands):
+    """
+    throughput and latency of commands sent through the command stack
+    """
+    duration, latencies, interval = asyncio.run(
+        send_commands(fake_dss, limiter=limiter, commands=commands, zones=1)
+    )
+    record(
+        commands=commands,
+        seconds=duration,
+        commands_per_second=commands / duration,
+        latency_p50=percentile(latencies, 50),
+        latency_p95=percentile(latencies, 95),
+        final_interval_ms=interval,
+    )
+
+
+def bench_command_lanes(fake_dss, record):
+    """
+    speedup of a scene for every room, sent in parallel lanes, over the same
+    number of commands to a single room
+    """
+    commands = 20
+
+    async def run():
+        single = await send_commands(fake_dss, limiter=dict(), commands=commands, zones=1)
+        spread = await send_commands(fake_dss, limiter=dict(), commands=commands, zones=commands)
+        return single[0], spread[0]
+
+    single, spread = asyncio.run(run())
+    record(
+        commands=commands,
+        single_zone_seconds=single,
+        zones_seconds=spread,
+        speedup=single / spread,
+    )
+    # the lanes share a rate of concurrency times the one of a single lane
+    assert spread < single * 0.6
+
+
+@pytest.mark.parametrize("entities", [10, 500])
+def bench_websocket_dispatch(fake_dss, record, entities):
+    """
+    rate of scene events received over the websocket and dispatched to the
+    callbacks of lights spread over the zones
+    """
+    events = 2000
+    zones = 50
+
+    async def run():
+        dss = await fake_dss(zones=zones).start()
+        client = create_client(dss)
+        listener = DSWebsocketEventListener(client=client)
+
+        # lights are spread evenly over the zones, every event is passed
+        # to the lights of its zone
+        lights = collections.Counter(entity % zones + 1 for entity in range(entities))
+        expected = sum(lights[event % zones + 1] for event in range(events))
+        received = 0
+        done = asyncio.Event()
+
+        async def callback(event):
+            nonlocal received
+            received += 1
+            if received == expected:
+                done.set()
+
+        for entity in range(entities):
+            listener.register_group(zone_id=entity % zones + 1, group_id=1, callback=callback)
+
+        await listener.start()
+        try:
+            await dss.wait_for_websocket()
+            started = time.perf_counter()
+            for event in range(events):
+                await dss.send_event(
+                    "callScene", zoneID=str(event % zones + 1), groupID="1", sceneID="5"
+                )
+            await asyncio.wait_for(done.wait(), 30)
+            return time.perf_counter() - started, expected
+        finally:
+            await listener.stop()
+            await client.close()
+            await dss.stop()
+
+    duration, callbacks = asyncio.run(run())
+    record(
+        events=events,
+        callbacks=callbacks,
+        seconds=duration,
+        events_per_second=events / duration,
+    )
@@ -0,0 +1,27 @@
+"""
+benchmark of the json codec on a large topology response
+"""
+import json
+import timeit
+
+from pydigitalstrom import codec
+
+from json_codec import synthetic_topology
+
+
+def bench_codec_loads(record):
+    body = synthetic_topology(zones=200)
+    number = 10
+
+    def measure(decode) -> float:
+        return min(timeit.repeat(decode, number=number, repeat=3)) / number
+
+    stdlib = measure(lambda: json.loads(body.decode("utf-8")))
+    current = measure(lambda: codec.loads(body))
+    record(
+        codec=codec.name(),
+        size_bytes=len(body),
+        stdlib_seconds=stdlib,
+        codec_seconds=current,
+        speedup=stdlib / current,
+    )
@@ -0,0 +1,112 @@
+"""
+benchmarks of pydigitalstrom against an in-process fake dSS
+
+run with
+    pytest benchmarks --bench-json=results.json
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+import aiohttp
+import pytest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "digitalstrom")
+)
+
+from pydigitalstrom import codec  # noqa: E402
+
+from fakedss import FakeDSS, create_ssl_context  # noqa: E402
+
+RESULTS_KEY = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("digitalstrom benchmarks")
+    group.addoption(
+        "--bench-json",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help="write the benchmark results as json to PATH",
+    )
+
+
+def pytest_configure(config):
+    config.stash[RESULTS_KEY] = []
+
+
+@pytest.fixture(scope="session")
+def ssl_context(tmp_path_factory):
+    return create_ssl_context(str(tmp_path_factory.mktemp("fakedss")))
+
+
+@pytest.fixture
+def fake_dss(ssl_context):
+    """
+    factory for fake servers, start and stop them in the event loop of the
+    benchmark
+    """
+
+    def create(**kwargs) -> FakeDSS:
+        return FakeDSS(ssl_context=ssl_context, **kwargs)
+
+    return create
+
+
+@pytest.fixture
+def record(request):
+    """
+    record the metrics of a benchmark, the parameters of the test are added
+    automatically
+    """
+    results = request.config.stash[RESULTS_KEY]
+
+    def add(**metrics) -> None:
+        params = getattr(request.node, "callspec", None)
+        results.append(
+            dict(
+                name=request.node.originalname,
+                params=dict(params.params) if params else dict(),
+                metrics=metrics,
+            )
+        )
+
+    return add
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    results = config.stash[RESULTS_KEY]
+    if not results:
+        return
+
+    terminalreporter.section("digitalstrom benchmarks")
+    for result in results:
+        params = ", ".join(f"{key}={value}" for key, value in result["params"].items())
+        metrics = ", ".join(
+            f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in result["metrics"].items()
+        )
+        terminalreporter.write_line(f"{result['name']}[{params}]: {metrics}")
+
+    path = config.getoption("--bench-json")
+    if path:
+        with open(path, "w") as f:
+            json.dump(
+                dict(
+                    created=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    machine=dict(
+                        python=platform.python_version(),
+                        platform=platform.platform(),
+                        aiohttp=aiohttp.__version__,
+                        codec=codec.name(),
+                    ),
+                    benchmarks=results,
+                ),
+                f,
+                indent=2,
+            )
+        terminalreporter.write_line(f"results written to {path}")
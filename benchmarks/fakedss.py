@@ -0,0 +1,157 @@
+"""
+in-process fake digitalSTROM server for the benchmarks
+"""
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+
+from aiohttp import web
+
+
+def create_ssl_context(directory: str) -> ssl.SSLContext:
+    """
+    create a server ssl context with a self-signed certificate, like the one
+    most digitalSTROM servers use
+    """
+    cert = os.path.join(directory, "fakedss.pem")
+    key = os.path.join(directory, "fakedss.key")
+    if not os.path.exists(cert):
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=localhost",
+            ],
+            check=True,
+            capture_output=True,
+        )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+class FakeDSS:
+    # scenes every light group of the fake apartment can reach
+    REACHABLE_SCENES = [0, 5, 17, 18, 19, 6, 7, 8, 9, 1, 2, 3, 4]
+
+    def __init__(self, ssl_context: ssl.SSLContext, zones: int = 10, meters: int = 2, latency: float = 0.0):
+        """
+        :param ssl_context: server ssl context
+        :param zones: number of named zones besides the apartment zone
+        :param meters: number of dSMeters
+        :param latency: seconds every http request is delayed by
+        """
+        self.ssl_context = ssl_context
+        self.zones = zones
+        self.meters = meters
+        self.latency = latency
+
+        self.port = None
+        self.requests = 0
+        self.logins = 0
+        self.sockets = []
+        self._runner = None
+
+    def _zones(self) -> dict:
+        result = {"zone0": {"ZoneID": 0, "name": "", "group1": {"group": 1, "color": 1}}}
+        for zone_id in range(1, self.zones + 1):
+            result[f"zone{zone_id}"] = {
+                "ZoneID": zone_id,
+                "name": f"Zone {zone_id}",
+                "group1": {"group": 1, "color": 1, "scene0": {"scene": 17, "name": "Reading"}},
+                "group2": {"group": 2, "color": 2},
+                "group3": {"group": 3, "color": 3},
+            }
+        return result
+
+    def _meters(self) -> dict:
+        return {
+            f"meter{meter}": {"dSUID": f"dsuid{meter}", "dSID": f"dsid{meter}", "name": f"Meter {meter}"}
+            for meter in range(self.meters)
+        }
+
+    def _result(self, result=None) -> web.Response:
+        data = dict(ok=True)
+        if result is not None:
+            data["result"] = result
+        return web.json_response(data)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = request.path
+        if path == "/json/system/loginApplication":
+            self.logins += 1
+            return self._result(dict(token=f"token{self.logins}"))
+
+        if path == "/json/property/query2":
+            query = request.query["query"]
+            if query.startswith("/apartment/zones"):
+                return self._result(self._zones())
+            if query.startswith("/apartment/dSMeters"):
+                return self._result(self._meters())
+
+        if path == "/json/zone/getReachableScenes":
+            return self._result(dict(reachableScenes=self.REACHABLE_SCENES))
+
+        if path == "/json/property/getChildren":
+            return self._result([dict(name=f"dsuid{meter}") for meter in range(self.meters)])
+
+        if path == "/json/property/getString":
+            return self._result(dict(value=request.query["path"].split("/")[-2]))
+
+        if path == "/json/metering/getLatest":
+            ids = request.query["from"][len(".meters("):-1].split(",")
+            return self._result(
+                dict(values=[dict(dSID=id, value=self.requests, date="") for id in ids])
+            )
+
+        if path == "/json/zone/callScene":
+            return self._result()
+
+        return web.json_response(dict(ok=False, message="unknown request"))
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        try:
+            async for msg in ws:
+                pass
+        finally:
+            self.sockets.remove(ws)
+        return ws
+
+    async def send_event(self, name: str, **properties) -> None:
+        """
+        send an event to all connected websockets
+        """
+        message = json.dumps(dict(name=name, properties=properties))
+        for ws in list(self.sockets):
+            await ws.send_str(message)
+
+    async def wait_for_websocket(self, timeout: float = 5) -> None:
+        async def connected():
+            while not self.sockets:
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(connected(), timeout)
+
+    async def start(self) -> "FakeDSS":
+        app = web.Application()
+        app.router.add_get("/websocket", self._websocket)
+        app.router.add_get("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0, ssl_context=self.ssl_context)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        for ws in list(self.sockets):
+            await ws.close()
+        await self._runner.cleanup()
@@ -0,0 +1,77 @@
+"""
+compare the json decoders on a large query2 topology response
+
+run with a response recorded from a dSS, e.g.
+    curl -k "https://dss:8080/json/property/query2?query=/apartment/zones/*(*)/groups/*(*)&token=..." > topology.json
+    python benchmarks/json_codec.py --file topology.json
+or without --file on a synthetic topology of the same shape
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "digitalstrom")
+)
+
+from pydigitalstrom import codec  # noqa: E402
+
+
+def synthetic_topology(zones: int = 500, groups: int = 12, scenes: int = 16) -> bytes:
+    """
+    build a query2 response like the one of the zones query with all
+    groups and custom scene names
+    """
+    result = dict()
+    for zone_id in range(zones):
+        zone = {"ZoneID": zone_id, "name": f"Zone {zone_id}", "present": True}
+        for group_id in range(1, groups + 1):
+            group = {
+                "group": group_id,
+                "color": group_id,
+                "name": f"Group {group_id}",
+                "lastCalledScene": 5,
+                "connectedDevices": 4,
+            }
+            for scene_id in range(scenes):
+                group[f"scene{scene_id}"] = {"scene": scene_id, "name": f"Scene {scene_id}"}
+            zone[f"group{group_id}"] = group
+        result[f"zone{zone_id}"] = zone
+
+    return json.dumps(dict(ok=True, result=result)).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", help="recorded query2 response")
+    parser.add_argument("--zones", type=int, default=500, help="zones of the synthetic topology")
+    parser.add_argument("--number", type=int, default=20, help="decodes per measurement")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            body = f.read()
+    else:
+        body = synthetic_topology(zones=args.zones)
+
+    print(f"response size: {len(body) / 1024 / 1024:.1f} MiB, codec: {codec.name()}")
+
+    candidates = [
+        # what raw_request did before, aiohttp decodes the body to a str first
+        ("json.loads(str)", lambda: json.loads(body.decode("utf-8"))),
+        ("json.loads(bytes)", lambda: json.loads(body)),
+    ]
+    if codec.orjson is not None:
+        candidates.append(("orjson.loads(bytes)", lambda: codec.orjson.loads(body)))
+
+    baseline = None
+    for name, decode in candidates:
+        seconds = min(timeit.repeat(decode, number=args.number, repeat=5)) / args.number
+        baseline = baseline or seconds
+        print(f"{name:<20} {seconds * 1000:8.2f} ms  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
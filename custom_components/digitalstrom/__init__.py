@@ -12,13 +12,15 @@ from homeassistant.const import (
     CONF_PASSWORD,
     CONF_ALIAS,
     CONF_TOKEN,
+    CONF_SCAN_INTERVAL,
     EVENT_HOMEASSISTANT_START,
     EVENT_HOMEASSISTANT_STOP,
     Platform,
 )
 from homeassistant.exceptions import ConfigEntryNotReady, InvalidStateError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.typing import ConfigType
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CoreState, HomeAssistant
 
 from .pydigitalstrom.client import DSClient
 from .pydigitalstrom.exceptions import DSException
@@ -28,10 +30,17 @@ from .const import (
     DOMAIN,
     HOST_FORMAT,
     SLUG_FORMAT,
+    STORAGE_KEY_FORMAT,
+    STORAGE_VERSION,
+    SIGNAL_TOPOLOGY_UPDATED,
+    SIGNAL_AVAILABILITY_UPDATED,
     CONF_DELAY,
     DEFAULT_DELAY,
+    DEFAULT_SCAN_INTERVAL,
+    REVALIDATE_RETRY_INTERVAL,
+    REVALIDATE_RETRY_MAX_INTERVAL,
 )
-from .util import slugify_entry
+from .util import slugify_entry, DSTopologyStore
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -76,9 +85,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         apptoken=entry.data[CONF_TOKEN],
         apartment_name=entry.data[CONF_ALIAS],
         stack_delay=entry.data.get(CONF_DELAY, DEFAULT_DELAY),
+        meter_interval=entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
         loop=hass.loop,
     )
-    listener = DSWebsocketEventListener(client=client, event_name="callScene")
+    listener = DSWebsocketEventListener(client=client)
 
     # store client in hass data for future usage
     entry_slug = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
@@ -86,35 +96,93 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data[DOMAIN][entry_slug]["client"] = client
     hass.data[DOMAIN][entry_slug]["listener"] = listener
 
-    # load all scenes from digitalSTROM server
-    # this fails often on the first connection, but works on the second
-    try:
-        await client.initialize()
-    except (DSException, RuntimeError, ConnectionResetError):
+    # mark the entities unavailable while the server is unreachable
+    def digitalstrom_circuit_changed(state: str):
+        _LOGGER.info(f"Circuit to digitalSTROM server at {client.host} is {state}")
+        async_dispatcher_send(hass, SIGNAL_AVAILABILITY_UPDATED.format(slug=entry_slug))
+
+    client.circuit.add_listener(digitalstrom_circuit_changed)
+
+    # start with the topology known from the last run, so entities are there
+    # right away and don't depend on the server being reachable
+    store = DSTopologyStore(hass, STORAGE_VERSION, STORAGE_KEY_FORMAT.format(slug=entry_slug))
+    cached_topology = await store.async_load()
+    if cached_topology:
+        _LOGGER.debug(f"Loaded cached topology of digitalSTROM server at {client.host}")
+        client.load_topology(cached_topology)
+        hass.data[DOMAIN][entry_slug]["topology_source"] = "cache"
+    else:
+        # load all scenes from digitalSTROM server
+        # this fails often on the first connection, but works on the second
         try:
             await client.initialize()
         except (DSException, RuntimeError, ConnectionResetError):
-            raise ConfigEntryNotReady(f"Failed to initialize digitalSTROM server at {client.host}")
+            try:
+                await client.initialize()
+            except (DSException, RuntimeError, ConnectionResetError):
+                raise ConfigEntryNotReady(f"Failed to initialize digitalSTROM server at {client.host}")
 
-    # we're connected
-    _LOGGER.debug(f"Successfully retrieved session token from digitalSTROM server at {client.host}")
+        # we're connected
+        _LOGGER.debug(f"Successfully retrieved session token from digitalSTROM server at {client.host}")
+        await store.async_save(client.topology)
+        hass.data[DOMAIN][entry_slug]["topology_source"] = "server"
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # check the cached topology against the server and update the entities
+    # if anything changed in the meantime
+    async def digitalstrom_revalidate_topology():
+        retry_interval = REVALIDATE_RETRY_INTERVAL
+        while True:
+            try:
+                topology = await client.fetch_topology()
+                break
+            except (DSException, RuntimeError, ConnectionResetError):
+                _LOGGER.warning(
+                    f"Failed to revalidate topology of digitalSTROM server at {client.host}, "
+                    f"retrying in {retry_interval} seconds"
+                )
+                await asyncio.sleep(retry_interval)
+                retry_interval = min(retry_interval * 2, REVALIDATE_RETRY_MAX_INTERVAL)
+
+        if topology == client.topology:
+            _LOGGER.debug(f"Cached topology of digitalSTROM server at {client.host} is up to date")
+            hass.data[DOMAIN][entry_slug]["topology_source"] = "cache, revalidated"
+            return
+
+        _LOGGER.info(f"Topology of digitalSTROM server at {client.host} changed, updating entities")
+        client.load_topology(topology)
+        await store.async_save(topology)
+        hass.data[DOMAIN][entry_slug]["topology_source"] = "server, cache outdated"
+        async_dispatcher_send(hass, SIGNAL_TOPOLOGY_UPDATED.format(slug=entry_slug))
+
+    if cached_topology:
+        hass.async_create_background_task(
+            digitalstrom_revalidate_topology(), "topology-revalidate"
+        )
+
 
     # start websocket listener and action delayer loops on hass startup
     async def digitalstrom_start_loops(event):
         _LOGGER.info(f"loops started for digitalSTROM server at {client.host}")
         hass.async_create_background_task(listener.start(), "websocket-start")
         hass.async_create_background_task(client.stack.start(), "requesthandler-start")
+        hass.async_create_background_task(client.metering.start(), "metering-start")
 
-    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, digitalstrom_start_loops)
+    # hass won't fire the start event again when the entry is set up later on
+    if hass.state is CoreState.running:
+        await digitalstrom_start_loops(None)
+    else:
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, digitalstrom_start_loops)
 
-    # start websocket listener and action delayer loops on hass shutdown
+    # stop websocket listener and action delayer loops on hass shutdown and
+    # release the pooled connections to the server
     async def digitalstrom_stop_loops(event):
         _LOGGER.info(f"loops stopped for digitalSTROM server at {client.host}")
-        hass.async_create_background_task(client.stack.stop(), "websocket-stop")
-        hass.async_create_background_task(listener.stop(), "requesthandler-stop")
+        await client.metering.stop()
+        await client.stack.stop()
+        await listener.stop()
+        await client.close()
 
     hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, digitalstrom_stop_loops)
 
@@ -11,19 +11,24 @@ from homeassistant.const import (
     CONF_PASSWORD,
     CONF_ALIAS,
     CONF_TOKEN,
+    CONF_SCAN_INTERVAL,
 )
 from homeassistant.core import callback
 from homeassistant.helpers import config_validation
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .const import (
     DOMAIN,
     HOST_FORMAT,
     DIGITALSTROM_MANUFACTURERS,
     CONF_DELAY,
+    CONF_STATE_DELAY,
     DEFAULT_ALIAS,
     DEFAULT_HOST,
     DEFAULT_PORT,
     DEFAULT_DELAY,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STATE_DELAY,
     DEFAULT_USERNAME,
     TITLE_FORMAT,
 )
@@ -65,6 +70,8 @@ class DigitalStromConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             CONF_PASSWORD: "",
             CONF_ALIAS: DEFAULT_ALIAS,
             CONF_DELAY: DEFAULT_DELAY,
+            CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL,
+            CONF_STATE_DELAY: DEFAULT_STATE_DELAY,
         }
         super().__init__(*args, **kwargs)
 
@@ -95,6 +102,7 @@ class DigitalStromConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     port=self.device_config[CONF_PORT],
                     username=self.device_config[CONF_USERNAME],
                     password=self.device_config[CONF_PASSWORD],
+                    session=async_get_clientsession(self.hass, verify_ssl=False),
                 )
                 try:
                     token = await handler.request_apptoken()
@@ -113,6 +121,8 @@ class DigitalStromConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                             CONF_PORT: self.device_config[CONF_PORT],
                             CONF_ALIAS: self.device_config[CONF_ALIAS],
                             CONF_DELAY: self.device_config[CONF_DELAY],
+                            CONF_SCAN_INTERVAL: self.device_config[CONF_SCAN_INTERVAL],
+                            CONF_STATE_DELAY: self.device_config[CONF_STATE_DELAY],
                         },
                     )
 
@@ -134,6 +144,14 @@ class DigitalStromConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     vol.Required(
                         CONF_DELAY, default=self.device_config[CONF_DELAY]
                     ): int,
+                    vol.Required(
+                        CONF_SCAN_INTERVAL,
+                        default=self.device_config[CONF_SCAN_INTERVAL],
+                    ): int,
+                    vol.Required(
+                        CONF_STATE_DELAY,
+                        default=self.device_config[CONF_STATE_DELAY],
+                    ): int,
                 }
             ),
             errors=errors,
@@ -8,12 +8,26 @@ DOMAIN: str = "digitalstrom"
 HOST_FORMAT: str = "https://{host}:{port}"
 SLUG_FORMAT: str = "{host}_{port}"
 TITLE_FORMAT: str = "{alias} ({host}:{port})"
+STORAGE_KEY_FORMAT: str = "digitalstrom.{slug}"
+SIGNAL_TOPOLOGY_UPDATED: str = "digitalstrom_topology_updated_{slug}"
+SIGNAL_AVAILABILITY_UPDATED: str = "digitalstrom_availability_updated_{slug}"
+
+# version 1 stored the raw property query, version 2 the normalized topology
+STORAGE_VERSION: int = 2
 
 CONF_DELAY: str = "delay"
+CONF_STATE_DELAY: str = "state_delay"
 
 DIGITALSTROM_MANUFACTURERS: List[str] = ["digitalSTROM AG", "aizo ag"]
 DEFAULT_HOST: str = "dss.local"
 DEFAULT_PORT: int = 8080
 DEFAULT_DELAY: int = 500
+DEFAULT_SCAN_INTERVAL: int = 30
+# ms to collect state changes of an entity before writing the final state
+DEFAULT_STATE_DELAY: int = 50
 DEFAULT_USERNAME: str = "dssadmin"
-DEFAULT_ALIAS: str = "Apartment"
\ No newline at end of file
+DEFAULT_ALIAS: str = "Apartment"
+# seconds between attempts to revalidate the cached topology, doubled after
+# every failed attempt up to the maximum
+REVALIDATE_RETRY_INTERVAL: int = 60
+REVALIDATE_RETRY_MAX_INTERVAL: int = 1800
@@ -13,7 +13,7 @@ from .pydigitalstrom.devices.scene import DSScene, DSColorScene
 from .pydigitalstrom.websocket import DSWebsocketEventListener
 
 from .const import DOMAIN
-from .util import slugify_entry
+from .util import slugify_entry, async_setup_topology_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,37 +35,34 @@ async def async_setup_entry(
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
     listener: DSWebsocketEventListener = hass.data[DOMAIN][entry_slug]["listener"]
-    devices: list = []
-    scenes: dict = client.get_scenes()
-
-    scene: Union[DSScene, DSColorScene]
-    for scene in scenes.values():
-        # only handle cover (color 2) scenes
-        if not isinstance(scene, DSColorScene) or scene.color != dsconst.GROUP_BLINDS:
-            continue
-        # not an area or broadcast turn off scene
-        if scene.scene_id > 4:
-            continue
-
-        # get turn on counterpart
-        scene_on: DSColorScene = scenes.get(
-            f"{scene.zone_id}_{scene.color}_{scene.scene_id + 5}", None
-        )
-
-        # no turn on scene found, skip
-        if not scene_on:
-            continue
-
-        # add cover
-        _LOGGER.info(f"adding cover {scene.scene_id}: {scene.name}")
-        devices.append(
-            DigitalstromCover(
-                hass=hass, scene_on=scene_on, scene_off=scene, listener=listener
-            )
-        )
-
-    device: DigitalstromCover
-    async_add_entities(device for device in devices)
+
+    def build_entities() -> list:
+        devices: list = []
+        apartment = client.apartment
+
+        # only handle cover (color 2) groups
+        for group in apartment.get_groups(color=dsconst.GROUP_BLINDS):
+            # area and broadcast turn off scenes
+            for off_scene_id in dsconst.SCENE_ON_OFF_PAIRS:
+                # get turn on counterpart, skip if there is none
+                pair = apartment.get_on_off_pair(
+                    zone_id=group.zone.zone_id, color=group.color, off_scene_id=off_scene_id
+                )
+                if not pair:
+                    continue
+                scene_on, scene = pair
+
+                # add cover
+                _LOGGER.info(f"adding cover {scene.scene_id}: {scene.name}")
+                devices.append(
+                    DigitalstromCover(
+                        hass=hass, scene_on=scene_on, scene_off=scene, listener=listener
+                    )
+                )
+
+        return devices
+
+    await async_setup_topology_entities(hass, entry, async_add_entities, build_entities)
 
 
 class DigitalstromCover(CoverEntity):
@@ -100,7 +97,7 @@ class DigitalstromCover(CoverEntity):
 
     @property
     def available(self) -> bool:
-        return True
+        return self._scene_off.available
 
     @property
     def is_closed(self) -> bool:
@@ -0,0 +1,84 @@
+"""Diagnostics support for the digitalSTROM component."""
+import time
+from collections import Counter
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PASSWORD, CONF_TOKEN
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry
+
+from .const import DOMAIN
+from .pydigitalstrom.client import DSClient
+from .pydigitalstrom.websocket import DSWebsocketEventListener
+from .util import slugify_entry
+
+TO_REDACT = {CONF_TOKEN, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """
+    return a snapshot of the topology and the performance of the server
+    communication of a config entry
+    """
+    entry_slug: str = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
+    data: dict = hass.data[DOMAIN][entry_slug]
+    client: DSClient = data["client"]
+    listener: DSWebsocketEventListener = data["listener"]
+
+    registry = entity_registry.async_get(hass)
+    entities = entity_registry.async_entries_for_config_entry(registry, entry.entry_id)
+
+    topology: dict = client.topology or dict()
+    metrics: dict = client.metrics.as_dict()
+    last_keepalive = listener.last_keepalive
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "topology": {
+            "source": data.get("topology_source"),
+            "zones": len(topology.get("zones", [])),
+            "light_groups": len(
+                [
+                    group
+                    for zone in topology.get("zones", [])
+                    for group in zone["groups"]
+                    if group["reachable_scenes"] is not None
+                ]
+            ),
+            "scenes": len(client.get_scenes()),
+            "meters": len(client.get_meters()),
+            "entities": dict(Counter(entity.domain for entity in entities)),
+            "entities_disabled": len([entity for entity in entities if entity.disabled]),
+        },
+        "scheduler": {
+            "running": client.stack.running,
+            "concurrency": client.stack.concurrency,
+            "lanes_busy": client.stack.lanes_busy,
+            "interval": client.stack.limiter.interval,
+            "latency": client.stack.limiter.latency,
+            **metrics["queue"],
+        },
+        "requests": {
+            **metrics["requests"],
+            "recent": list(client.metrics.recent_requests),
+        },
+        "circuit": client.circuit.as_dict(),
+        "token": {
+            "valid": client.tokens.is_valid(),
+            "refreshes": metrics["token_refreshes"],
+        },
+        "websocket": {
+            "state": listener.state,
+            "event_names": listener.event_names,
+            "seconds_since_keepalive": (
+                round(time.monotonic() - last_keepalive, 1) if last_keepalive else None
+            ),
+            **metrics["websocket"],
+        },
+        "metering": {
+            "interval": client.metering.interval,
+        },
+    }
@@ -16,10 +16,11 @@ from homeassistant.core import HomeAssistant
 from .pydigitalstrom.client import DSClient
 from .pydigitalstrom import constants as dsconst
 from .pydigitalstrom.devices.scene import DSScene, DSColorScene
+from .pydigitalstrom.events import DSEvent
 from .pydigitalstrom.websocket import DSWebsocketEventListener
 
 from .const import DOMAIN
-from .util import slugify_entry
+from .util import slugify_entry, async_setup_topology_entities, get_state_delay, DSStateWriter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,67 +44,55 @@ async def async_setup_entry(
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
     listener: DSWebsocketEventListener = hass.data[DOMAIN][entry_slug]["listener"]
-    devices: dict = []
-    scenes: dict = client.get_scenes()
-
-    scene: Union[DSScene, DSColorScene]
-    for scene in scenes.values():
-        # only handle light (color 1) scenes
-        if not isinstance(scene, DSColorScene) or scene.color != dsconst.GROUP_LIGHTS:
-            continue
-        # not an area or broadcast turn off scene
-        if scene.scene_id not in (
-            dsconst.SCENES["PRESET"]["SCENE_PRESET0"],
-            dsconst.SCENES["AREA"]["SCENE_AREA1_OFF"],
-            dsconst.SCENES["AREA"]["SCENE_AREA2_OFF"],
-            dsconst.SCENES["AREA"]["SCENE_AREA3_OFF"],
-            dsconst.SCENES["AREA"]["SCENE_AREA4_OFF"],
-        ):
-            continue
-
-        # get turn on counterpart
-        scene_on: Union[DSScene, DSColorScene] = scenes.get(
-            f"{scene.zone_id}_{scene.color}_{scene.scene_id + 5}", None,
-        )
-
-        effects = dict()
-
-        # get Preset X2-x4
-        if scene.scene_id == dsconst.SCENES["PRESET"]["SCENE_PRESET0"]:
-            effects["preset2"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET2']}", None,)
-            effects["preset3"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET3']}", None,)
-            effects["preset4"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET4']}", None,)
-        
-        if scene.scene_id == dsconst.SCENES["PRESET"]["SCENE_PRESET10"]:
-            effects["preset2"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET12']}", None,)
-            effects["preset3"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET13']}", None,)
-            effects["preset4"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET14']}", None,)
-        
-        if scene.scene_id == dsconst.SCENES["PRESET"]["SCENE_PRESET20"]:
-            effects["preset2"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET22']}", None,)
-            effects["preset3"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET23']}", None,)
-            effects["preset4"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET24']}", None,)
-
-        if scene.scene_id == dsconst.SCENES["PRESET"]["SCENE_PRESET30"]:
-            effects["preset2"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET32']}", None,)
-            effects["preset3"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET33']}", None,)
-            effects["preset4"] = scenes.get(f"{scene.zone_id}_{scene.color}_{dsconst.SCENES['PRESET']['SCENE_PRESET34']}", None,)
-
-
-        # no turn on scene found, skip
-        if not scene_on:
-            continue
-
-        # add light
-        _LOGGER.info(f"adding light {scene.scene_id}: Off: {scene.name}, On: {scene_on.name}, Preset2: {effects['preset2'].name}, Preset3: {effects['preset3'].name}, Preset4: {effects['preset4'].name}")
-        devices.append(
-            DigitalstromLight(
-                hass=hass, scene_on=scene_on, scene_off=scene, listener=listener, effects=effects
-            )
-        )
 
-    device: DigitalstromLight
-    async_add_entities(device for device in devices)
+    def build_entities() -> list:
+        devices: list = []
+        apartment = client.apartment
+
+        # only handle light (color 1) groups
+        for group in apartment.get_groups(color=dsconst.GROUP_LIGHTS):
+            # one light per area and one for the broadcast turn off scene
+            for off_scene_id in (
+                dsconst.SCENES["PRESET"]["SCENE_PRESET0"],
+                dsconst.SCENES["AREA"]["SCENE_AREA1_OFF"],
+                dsconst.SCENES["AREA"]["SCENE_AREA2_OFF"],
+                dsconst.SCENES["AREA"]["SCENE_AREA3_OFF"],
+                dsconst.SCENES["AREA"]["SCENE_AREA4_OFF"],
+            ):
+                # get turn on counterpart, skip if there is none
+                pair = apartment.get_on_off_pair(
+                    zone_id=group.zone.zone_id, color=group.color, off_scene_id=off_scene_id
+                )
+                if not pair:
+                    continue
+                scene_on, scene = pair
+
+                # get Preset X2-x4
+                effects: dict = apartment.get_presets(
+                    zone_id=group.zone.zone_id, color=group.color, off_scene_id=off_scene_id
+                )
+
+                # add light
+                _LOGGER.info(
+                    f"adding light {scene.scene_id}: Off: {scene.name}, On: {scene_on.name}, "
+                    + ", ".join(
+                        f"{name}: {preset.name}" for name, preset in effects.items() if preset
+                    )
+                )
+                devices.append(
+                    DigitalstromLight(
+                        hass=hass,
+                        scene_on=scene_on,
+                        scene_off=scene,
+                        listener=listener,
+                        effects=effects,
+                        state_delay=get_state_delay(entry),
+                    )
+                )
+
+        return devices
+
+    await async_setup_topology_entities(hass, entry, async_add_entities, build_entities)
 
 
 class DigitalstromLight(RestoreEntity, LightEntity):
@@ -114,6 +103,7 @@ class DigitalstromLight(RestoreEntity, LightEntity):
         scene_off: Union[DSScene, DSColorScene],
         listener: DSWebsocketEventListener,
         effects,
+        state_delay: float = 0,
         *args,
         **kwargs,
     ):
@@ -124,11 +114,10 @@ class DigitalstromLight(RestoreEntity, LightEntity):
         self._state: bool = None
         self._scene_effects = effects
         self._effect = ""
+        self._state_writer = DSStateWriter(entity=self, delay=state_delay)
 
         super().__init__(*args, **kwargs)
 
-        self.register_callback()
-
     @property
     def supported_features(self):
         """Flag supported features."""
@@ -160,56 +149,40 @@ class DigitalstromLight(RestoreEntity, LightEntity):
         return ["PRESET1","PRESET2", "PRESET3", "PRESET4"]
 
     def register_callback(self):
-        async def event_callback(event: dict) -> None:
-            # sanity checks
-            if "name" not in event:
-                return
-            if event["name"] != "callScene":
-                return
-            if "properties" not in event:
-                return
-            if "sceneID" not in event["properties"]:
-                return
-            if "groupID" not in event["properties"]:
-                return
-            if "zoneID" not in event["properties"]:
-                return
-
-            # cast event data
-            zone_id: int = int(event["properties"]["zoneID"])
-            group_id: int = int(event["properties"]["groupID"])
-            scene_id: int = int(event["properties"]["sceneID"])
-
-            # Map preset scene ids to effect names
-            preset_map = {
-                dsconst.SCENES["PRESET"]["SCENE_PRESET1"]: "PRESET1",
-                dsconst.SCENES["PRESET"]["SCENE_PRESET2"]: "PRESET2",
-                dsconst.SCENES["PRESET"]["SCENE_PRESET3"]: "PRESET3",
-                dsconst.SCENES["PRESET"]["SCENE_PRESET4"]: "PRESET4",
-            }
+        # Map preset scene ids to effect names
+        preset_map = {
+            dsconst.SCENES["PRESET"]["SCENE_PRESET1"]: "PRESET1",
+            dsconst.SCENES["PRESET"]["SCENE_PRESET2"]: "PRESET2",
+            dsconst.SCENES["PRESET"]["SCENE_PRESET3"]: "PRESET3",
+            dsconst.SCENES["PRESET"]["SCENE_PRESET4"]: "PRESET4",
+        }
 
+        async def event_callback(event: DSEvent) -> None:
             # device turned on or broadcast turned on (handle PRESET1..PRESET4)
-            if (
-                self._scene_on.zone_id == zone_id
-                and self._scene_on.color == group_id
-                and (self._scene_on.scene_id == scene_id or scene_id in preset_map)
-            ):
+            if self._scene_on.scene_id == event.scene_id or event.scene_id in preset_map:
                 self._state = True
                 # set effect according to which preset was called (default to PRESET1)
-                self._effect = preset_map.get(scene_id, "PRESET1")
-                self.async_write_ha_state()
+                self._effect = preset_map.get(event.scene_id, "PRESET1")
+                self._state_writer.schedule()
             # device turned off or broadcast turned off
             elif (
-                self._scene_off.zone_id == zone_id
-                and self._scene_off.color == group_id
-                and (self._scene_off.scene_id == scene_id or dsconst.SCENES["PRESET"]["SCENE_PRESET0"] == scene_id)
+                self._scene_off.scene_id == event.scene_id
+                or dsconst.SCENES["PRESET"]["SCENE_PRESET0"] == event.scene_id
             ):
                 self._state = False
                 self._effect = ""
-                self.async_write_ha_state()
+                self._state_writer.schedule()
 
         _LOGGER.debug(f"Register callback for {self._scene_off.name}")
-        self._listener.register(callback=event_callback)
+        self.async_on_remove(self._state_writer.cancel)
+        # the listener only passes events for the zone and color of the light
+        self.async_on_remove(
+            self._listener.register_group(
+                zone_id=self._scene_off.zone_id,
+                group_id=self._scene_off.color,
+                callback=event_callback,
+            )
+        )
 
     @property
     def name(self) -> str:
@@ -224,7 +197,7 @@ class DigitalstromLight(RestoreEntity, LightEntity):
 
     @property
     def available(self) -> bool:
-        return True
+        return self._scene_off.available
 
     @property
     def is_on(self) -> bool:
@@ -261,6 +234,8 @@ class DigitalstromLight(RestoreEntity, LightEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
+        self.register_callback()
+
         state: bool = await self.async_get_last_state()
         if not state:
             return
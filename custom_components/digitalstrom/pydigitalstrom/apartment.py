@@ -0,0 +1,168 @@
+# -*- coding: UTF-8 -*-
+import sys
+from typing import Optional
+
+from .constants import SCENES, SCENE_ON_OFF_PAIRS, SCENE_PRESET_EFFECTS, SCENE_STATE_PAIRS
+
+GROUP_INDEPENDENT_SCENES_BYID = {
+    scene_id: scene_name for scene_name, scene_id in SCENES["GROUP_INDIPENDENT"].items()
+}
+
+
+class DSGroup:
+    def __init__(self, zone: "DSZone", group_id: int, color: int):
+        """
+        :param zone: zone the group belongs to
+        :param group_id: id of the group within the zone
+        :param color: color (function) of the group, e.g. 1 for lights
+        """
+        self.zone = zone
+        self.group_id = group_id
+        self.color = color
+        # scene id to scene
+        self.scenes = dict()
+
+
+class DSZone:
+    def __init__(self, zone_id: int, name: str):
+        self.zone_id = zone_id
+        # shared by all devices of the zone
+        self.name = sys.intern(name)
+        # group id to group
+        self.groups = dict()
+        # scene id to group independent scene, created on first use
+        self.scenes = dict()
+
+
+class DSApartment:
+    """
+    zones, groups and scenes of a server, indexed by their ids
+
+    scenes are indexed by (zone_id, scene_id) for group independent scenes
+    and (zone_id, color, scene_id) for scenes of a group. every zone can
+    call every group independent scene, but only few of them are used, so
+    these are created when they're asked for the first time
+    """
+
+    def __init__(self, client, name: str):
+        """
+        :param client: client the scenes send their commands with
+        :param name: name of the apartment
+        """
+        self._client = client
+        self.name = name
+        # zone id to zone
+        self.zones = dict()
+        self.scenes = dict()
+        # color to groups of all zones
+        self._groups_by_color = dict()
+
+    def add_zone(self, zone_id: int, name: str) -> DSZone:
+        zone = self.zones[zone_id] = DSZone(zone_id=zone_id, name=name)
+        return zone
+
+    def add_group(self, zone: DSZone, group_id: int, color: int) -> DSGroup:
+        group = zone.groups[group_id] = DSGroup(zone=zone, group_id=group_id, color=color)
+        self._groups_by_color.setdefault(color, []).append(group)
+        return group
+
+    def add_scene(self, scene, group: DSGroup = None) -> None:
+        """
+        :param scene: DSScene or DSColorScene to add
+        :param group: group of a DSColorScene
+        """
+        if group is not None:
+            group.scenes[scene.scene_id] = scene
+            self.scenes[(scene.zone_id, scene.color, scene.scene_id)] = scene
+        else:
+            self.zones[scene.zone_id].scenes[scene.scene_id] = scene
+            self.scenes[(scene.zone_id, scene.scene_id)] = scene
+
+    def get_groups(self, color: int) -> list:
+        """
+        groups of a color in all zones
+        """
+        return self._groups_by_color.get(color, [])
+
+    def get_scene(self, zone_id: int, scene_id: int, color: int = None):
+        """
+        :param zone_id: zone of the scene
+        :param scene_id: id of the scene
+        :param color: color of the group, None for group independent scenes
+        :return: scene or None if the zone doesn't have it
+        """
+        if color is None:
+            scene = self.scenes.get((zone_id, scene_id))
+            if scene is None:
+                scene = self._create_group_independent_scene(zone_id=zone_id, scene_id=scene_id)
+            return scene
+        return self.scenes.get((zone_id, color, scene_id))
+
+    def _create_group_independent_scene(self, zone_id: int, scene_id: int):
+        from .devices.scene import DSScene
+
+        zone = self.zones.get(zone_id)
+        scene_name = GROUP_INDEPENDENT_SCENES_BYID.get(scene_id)
+        if zone is None or scene_name is None:
+            return None
+
+        scene = DSScene(
+            client=self._client,
+            zone_id=zone_id,
+            zone_name=zone.name,
+            scene_id=scene_id,
+            scene_name=scene_name,
+        )
+        self.add_scene(scene)
+        return scene
+
+    def get_on_off_pair(self, zone_id: int, color: int, off_scene_id: int) -> Optional[tuple]:
+        """
+        scenes turning a zone/group or one of its areas on and off
+
+        :param off_scene_id: the turn off scene, e.g. preset 0 or area 1 off
+        :return: (on scene, off scene) or None if one of them is missing
+        """
+        on_scene_id = SCENE_ON_OFF_PAIRS.get(off_scene_id)
+        if on_scene_id is None:
+            return None
+
+        scene_on = self.get_scene(zone_id=zone_id, scene_id=on_scene_id, color=color)
+        scene_off = self.get_scene(zone_id=zone_id, scene_id=off_scene_id, color=color)
+        if scene_on is None or scene_off is None:
+            return None
+        return scene_on, scene_off
+
+    def get_state_pair(self, zone_id: int, scene_id: int) -> Optional[tuple]:
+        """
+        group independent scenes entering and leaving a state of a zone
+
+        :param scene_id: the scene entering the state, e.g. sleeping
+        :return: (enter scene, leave scene) or None if one of them is missing
+        """
+        leave_scene_id = SCENE_STATE_PAIRS.get(scene_id)
+        if leave_scene_id is None:
+            return None
+
+        scene_enter = self.get_scene(zone_id=zone_id, scene_id=scene_id)
+        scene_leave = self.get_scene(zone_id=zone_id, scene_id=leave_scene_id)
+        if scene_enter is None or scene_leave is None:
+            return None
+        return scene_enter, scene_leave
+
+    def get_presets(self, zone_id: int, color: int, off_scene_id: int) -> dict:
+        """
+        presets X2-X4 belonging to the preset row of a turn off scene
+
+        :return: dict of preset2, preset3 and preset4 to the scene, None for
+            presets the group can't reach
+        """
+        preset_ids = SCENE_PRESET_EFFECTS.get(off_scene_id, (None, None, None))
+        return {
+            f"preset{number}": (
+                self.get_scene(zone_id=zone_id, scene_id=scene_id, color=color)
+                if scene_id is not None
+                else None
+            )
+            for number, scene_id in enumerate(preset_ids, start=2)
+        }
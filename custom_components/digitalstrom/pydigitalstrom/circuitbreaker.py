@@ -0,0 +1,150 @@
+import itertools
+import logging
+import time
+
+from .exceptions import DSCircuitOpenException
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class DSCircuitBreaker:
+    """
+    stop sending requests to a server that keeps failing
+
+    after failure_threshold failed requests in a row the circuit opens and
+    requests fail right away. once the reset timeout passed a single probe
+    request is let through (half open), closing the circuit again if it
+    succeeds and reopening it with a doubled timeout if it fails
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: int = 30, max_reset_timeout: int = 300):
+        """
+        :param failure_threshold: failed requests in a row opening the circuit
+        :param reset_timeout: seconds before the first probe request
+        :param max_reset_timeout: longest time between two probe requests
+        """
+        self._failure_threshold = failure_threshold
+        self._base_reset_timeout = reset_timeout
+        self._max_reset_timeout = max_reset_timeout
+
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._reset_timeout = reset_timeout
+        self._opened = 0.0
+        # ticket of the probe request in flight, None if there is none
+        self._probe = None
+        self._tickets = itertools.count(1)
+        self._listeners = []
+
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and time.monotonic() >= self._opened + self._reset_timeout:
+            return STATE_HALF_OPEN
+        return self._state
+
+    @property
+    def closed(self) -> bool:
+        return self._state == STATE_CLOSED
+
+    def add_listener(self, callback: callable) -> callable:
+        """
+        get notified when the circuit opens or closes
+
+        :param callback: function called with the new state
+        :return: function to remove the callback again
+        """
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def _set_state(self, state: str) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        for callback in list(self._listeners):
+            try:
+                callback(state)
+            except Exception:
+                _LOGGER.exception("Circuit breaker listener failed")
+
+    def before_request(self):
+        """
+        call before every request
+
+        :return: ticket to pass on to record_success, record_failure or
+            release if the request is the probe, None otherwise
+        :raises: DSCircuitOpenException if the request must not be sent
+        """
+        state = self.state
+        if state == STATE_CLOSED:
+            return None
+
+        # only one probe at a time, everything else keeps failing fast
+        if state == STATE_HALF_OPEN and self._probe is None:
+            _LOGGER.debug("Circuit half open, sending probe request")
+            self._probe = next(self._tickets)
+            return self._probe
+
+        self.rejected += 1
+        raise DSCircuitOpenException("server unreachable, circuit open")
+
+    def _is_probe(self, ticket) -> bool:
+        return ticket is not None and ticket == self._probe
+
+    def record_success(self, ticket=None) -> None:
+        """
+        :param ticket: ticket returned by before_request
+        """
+        if self._state != STATE_CLOSED:
+            _LOGGER.info("Server reachable again, circuit closed")
+        self._failures = 0
+        # a probe still in flight is an ordinary request now
+        self._probe = None
+        self._reset_timeout = self._base_reset_timeout
+        self._set_state(STATE_CLOSED)
+
+    def release(self, ticket=None) -> None:
+        """
+        call when a request was cancelled before it had an outcome, so
+        another probe can be sent
+
+        :param ticket: ticket returned by before_request
+        """
+        if self._is_probe(ticket):
+            self._probe = None
+
+    def record_failure(self, ticket=None) -> None:
+        """
+        :param ticket: ticket returned by before_request, requests sent
+            before the circuit opened don't affect the probes
+        """
+        self._failures += 1
+
+        if self._is_probe(ticket):
+            # the probe failed, wait longer for the next one
+            self._probe = None
+            self._reset_timeout = min(self._reset_timeout * 2, self._max_reset_timeout)
+            self._opened = time.monotonic()
+            _LOGGER.debug(f"Probe request failed, next probe in {self._reset_timeout} seconds")
+            return
+
+        if self._state == STATE_CLOSED and self._failures >= self._failure_threshold:
+            self._opened = time.monotonic()
+            _LOGGER.warning(
+                f"Server unreachable after {self._failures} failed requests, "
+                f"circuit open for {self._reset_timeout} seconds"
+            )
+            self._set_state(STATE_OPEN)
+
+    def as_dict(self) -> dict:
+        return dict(
+            state=self.state,
+            failures=self._failures,
+            reset_timeout=self._reset_timeout,
+            rejected=self.rejected,
+        )
@@ -1,17 +1,21 @@
 # -*- coding: UTF-8 -*-
-import time
 import logging
+import time
 
 import aiohttp
 import asyncio
 
+from .apartment import DSApartment
 from .constants import GROUP_LIGHTS, SCENES, ALL_SCENES_BYNAME, ALL_SCENES_BYID
 from .exceptions import (
     DSException,
+    DSAuthenticationException,
     DSCommandFailedException,
     DSRequestException,
+    DSTimeoutException,
 )
 from .requesthandler import DSRequestHandler
+from .tokenmanager import DSTokenManager
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,9 +27,8 @@ class DSClient(DSRequestHandler):
     URL_REACHABLE_SCENES = "/json/zone/getReachableScenes?id={zoneId}&groupID={groupId}"
     URL_SCENE_GETNAME = "/json/zone/sceneGetName?id={zoneId}&groupID={groupId}&sceneNumber={scene}"
 
-    URL_SESSIONTOKEN = "/json/system/loginApplication?loginToken={apptoken}"
-
-    URL_METERS = "/json/property/getChildren?path=/apartment/dSMeters/"
+    URL_METERS = "/json/property/query2?query=/apartment/dSMeters/*(dSUID,dSID,name)"
+    URL_GET_LATEST = "/json/metering/getLatest?from=.meters({dsids})&type={type}"
 
     def __init__(
         self,
@@ -34,177 +37,348 @@ class DSClient(DSRequestHandler):
         apptoken: str,
         apartment_name: str,
         stack_delay: int = 500,
+        stack_min_delay: int = 100,
+        stack_max_delay: int = 5000,
+        stack_burst: int = 3,
+        stack_concurrency: int = 4,
         loop: asyncio.AbstractEventLoop = None,
+        session: aiohttp.ClientSession = None,
+        pool_size: int = 10,
+        discovery_concurrency: int = 4,
+        meter_interval: int = 30,
     ):
-        self._apptoken = apptoken
         self._apartment_name = apartment_name
+        self._discovery_concurrency = discovery_concurrency
 
-        self._last_request = None
-        self._session_token = None
-        self._scenes = dict()
+        self.tokens = DSTokenManager(handler=self, apptoken=apptoken)
+        self.topology = None
+        self.apartment = DSApartment(client=self, name=apartment_name)
         self._meters = dict()
 
+        super().__init__(
+            host=host, port=port, loop=loop, session=session, pool_size=pool_size
+        )
+
         from .commandstack import DSCommandStack
 
-        self.stack = DSCommandStack(client=self, delay=stack_delay)
+        self.stack = DSCommandStack(
+            client=self,
+            delay=stack_delay,
+            min_delay=stack_min_delay,
+            max_delay=stack_max_delay,
+            burst=stack_burst,
+            concurrency=stack_concurrency,
+        )
+
+        from .metercoordinator import DSMeterCoordinator
 
-        super().__init__(host=host, port=port, loop=loop)
+        self.metering = DSMeterCoordinator(client=self, interval=meter_interval)
 
-    async def request(self, url: str, **kwargs):
+    async def request(self, url: str, timeout: float = None, deadline: float = None, **kwargs):
         """
         run an authenticated request against the digitalstrom server
 
         :param str url:
+        :param timeout: seconds a single attempt may take
+        :param deadline: time.monotonic() by which the request including
+            logins and retries has to be done, defaults to REQUEST_BUDGET
+            from now
         :return:
+        :raises: DSTimeoutException
         """
-        # get a session id, they time out 60 seconds after the last request,
-        # we go for 50 to be secure
-        if not self._last_request or self._last_request < time.time() - 50:
-            self._session_token = await self.get_session_token()
+        if deadline is None:
+            deadline = time.monotonic() + self.REQUEST_BUDGET
+
+        # get a session token, shared with all concurrent requests and the
+        # websocket listener
+        token = await self._get_token(deadline=deadline)
 
-        # update last request timestamp and call api
         _LOGGER.debug("Request to {url}".format(url = url))
-        self._last_request = time.time()
-        data = await self.raw_request(
-            url=url, params=dict(token=self._session_token), **kwargs
-        )
+        self.tokens.touch()
+        try:
+            data = await self.raw_request(
+                url=url, params=dict(token=token), timeout=timeout, deadline=deadline, **kwargs
+            )
+        except DSAuthenticationException:
+            # the server dropped our session, log in again and retry once
+            _LOGGER.debug("Session token rejected, retrying with a fresh one")
+            self.tokens.invalidate(token=token)
+            token = await self._get_token(deadline=deadline)
+            data = await self.raw_request(
+                url=url, params=dict(token=token), timeout=timeout, deadline=deadline, **kwargs
+            )
         return data
 
+    async def _get_token(self, deadline: float) -> str:
+        # the login is shielded by the token manager, giving up on it only
+        # stops waiting for it
+        try:
+            return await asyncio.wait_for(
+                self.tokens.get_token(), timeout=max(deadline - time.monotonic(), 0)
+            )
+        except asyncio.TimeoutError:
+            raise DSTimeoutException("timed out waiting for a session token")
+
     async def get_session_token(self):
-        data = await self.raw_request(
-            self.URL_SESSIONTOKEN.format(apptoken=self._apptoken)
+        return await self.tokens.get_token()
+
+    async def gather_limited(self, coroutines: list) -> list:
+        """
+        run coroutines concurrently, but at most discovery_concurrency at the
+        same time to not overload the server
+
+        :param coroutines: coroutines to run
+        :return: list of results in the order of the coroutines
+        """
+        semaphore = asyncio.Semaphore(self._discovery_concurrency)
+
+        async def run(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        tasks = [asyncio.ensure_future(run(coroutine)) for coroutine in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # don't leave the other requests running after one failed
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def get_reachable_scenes(self, zone_id: int, group_id: int) -> list:
+        _LOGGER.debug("Get reachable scenes for Zone {zone_id} / Group {group_id}".format(zone_id=zone_id, group_id=group_id))
+        response = await self.request(
+            url=self.URL_REACHABLE_SCENES.format(zoneId=zone_id, groupId=group_id)
         )
-        if "result" not in data or "token" not in data["result"]:
-            raise DSException("invalid api response")
-        return data["result"]["token"]
+        if "result" not in response:
+            raise DSCommandFailedException("no result in server response")
+        return response["result"]["reachableScenes"]
 
     async def initialize(self):
-        from .devices.scene import DSScene, DSColorScene
+        self.load_topology(await self.fetch_topology())
+
+    async def fetch_topology(self) -> dict:
+        """
+        get zones, groups, scenes and meters from the server
 
+        :return: json serializable topology to pass to load_topology, it
+            only holds what the scenes and meters are built from, so the
+            topologies of two runs are equal unless the apartment changed
+        """
         # get scenes
         response = await self.request(url=self.URL_SCENES)
         if "result" not in response:
             raise DSCommandFailedException("no result in server response")
-        result = response["result"]
+        zones = self._normalize_zones(response["result"])
+
+        # get reachable scenes of all light groups at once
+        light_groups = [
+            (zone_id, group)
+            for zone_id, zone_name, zone in self._named_zones(zones)
+            for group in zone["groups"]
+            if group["id"] in [GROUP_LIGHTS]
+        ]
+        reachable_scenes = await self.gather_limited(
+            [
+                self.get_reachable_scenes(zone_id=zone_id, group_id=group["id"])
+                for zone_id, group in light_groups
+            ]
+        )
+        for (zone_id, group), scenes in zip(light_groups, reachable_scenes):
+            group["reachable_scenes"] = sorted(scenes)
 
-        # set name for apartment zone
-        if "zone0" in result and "name" in result["zone0"]:
-            result["zone0"]["name"] = self._apartment_name
+        # get meters
+        response = await self.request(url=self.URL_METERS)
+        if "result" not in response:
+            raise DSCommandFailedException("no result in server response")
+        meters = sorted(
+            (
+                dict(dSUID=meter.get("dSUID", dsuid), dSID=meter.get("dSID"), name=meter.get("name"))
+                for dsuid, meter in response["result"].items()
+            ),
+            key=lambda meter: meter["dSUID"],
+        )
+
+        return dict(zones=zones, meters=meters)
+
+    @staticmethod
+    def _normalize_zones(zones: dict) -> list:
+        """
+        pick zone, group and scene ids and names from the property query,
+        leaving out volatile state like the last called scene of a group
+        """
+        result = []
+        for zone in zones.values():
+            groups = []
+            for zone_key, zone_value in zone.items():
+                # we're only interested in groups
+                if not str(zone_key).startswith("group"):
+                    continue
+
+                scenes = [
+                    dict(id=group_value["scene"], name=group_value["name"])
+                    for group_key, group_value in zone_value.items()
+                    if str(group_key).startswith("scene")
+                ]
+                groups.append(
+                    dict(
+                        id=zone_value["group"],
+                        color=zone_value.get("color"),
+                        scenes=sorted(scenes, key=lambda scene: scene["id"]),
+                        # only fetched for light groups
+                        reachable_scenes=None,
+                    )
+                )
+
+            result.append(
+                dict(
+                    id=zone["ZoneID"],
+                    name=zone.get("name"),
+                    groups=sorted(groups, key=lambda group: group["id"]),
+                )
+            )
+        return sorted(result, key=lambda zone: zone["id"])
+
+    def _named_zones(self, zones: list):
+        for zone in zones:
+            zone_name = zone["name"]
+
+            # set name for apartment zone
+            if zone["id"] == 0 and zone_name is not None:
+                zone_name = self._apartment_name
 
-        # create scene objects
-        for zone in result.values():
             # skip unnamed zones
-            if not zone["name"]:
+            if not zone_name:
                 continue
 
-            zone_id = zone["ZoneID"]
-            zone_name = zone["name"]
+            yield zone["id"], zone_name, zone
 
-            _LOGGER.debug("Zone ID: {zone_id} Name: {zone_name}".format(zone_id = zone_id, zone_name=zone_name))
+    def load_topology(self, topology: dict) -> None:
+        """
+        create scene and meter objects, replacing the current ones
 
-            # add generic zone scenes
-            _LOGGER.debug("adding generic scenes")
-            for scene_name, scene_id in SCENES["GROUP_INDIPENDENT"].items():
-                id = "{zone_id}_{scene_id}".format(zone_id=zone_id, scene_id=scene_id)
-                
-                _LOGGER.debug("adding DSScene Zone Name {zone_name} Scene Name {scene_name}".format(zone_name=zone_name, scene_name=scene_name))
-                self._scenes[id] = DSScene(
-                    client=self,
-                    zone_id=zone_id,
-                    zone_name=zone_name,
-                    scene_id=scene_id,
-                    scene_name=scene_name,
-                )
+        :param topology: topology as returned by fetch_topology
+        """
+        from .devices.scene import DSColorScene
+        from .devices.meter import DSMeter
 
-            # add reachable scenes and custom named scenes (?)
-            for zone_key, zone_value in zone.items():
-                # we're only interested in groups
-                if not str(zone_key).startswith("group"):
-                    continue
+        apartment = DSApartment(client=self, name=self._apartment_name)
+        self._meters = dict()
+        self.topology = topology
 
-                groupId = zone_value["group"]
+        # create scene objects
+        for zone_id, zone_name, zone_data in self._named_zones(topology["zones"]):
+            _LOGGER.debug("Zone ID: {zone_id} Name: {zone_name}".format(zone_id = zone_id, zone_name=zone_name))
+            # generic zone scenes are created by the apartment when needed
+            zone = apartment.add_zone(zone_id=zone_id, name=zone_name)
+
+            for group_data in zone_data["groups"]:
+                groupId = group_data["id"]
 
                 # only light group
                 if groupId not in [GROUP_LIGHTS]:
                     continue
 
                 # remember the color
-                color = zone_value["color"]
+                color = group_data["color"]
+                group = apartment.add_group(zone=zone, group_id=groupId, color=color)
 
                 _LOGGER.debug("Group Color: {color}".format(color=color))
 
-                # get reachable scenes
-                _LOGGER.debug("Get reachable scenes for Zone {zone_id} / Group {group_id}".format(zone_id=zone_id, group_id=groupId))
-                response_rs = await self.request(url=self.URL_REACHABLE_SCENES.format(zoneId=zone_id, groupId=groupId))
-                if "result" not in response_rs:
-                    raise DSCommandFailedException("no result in server response")
-                result_rs = response_rs["result"]
+                result_rs = group_data["reachable_scenes"] or []
 
-                _LOGGER.debug("adding {count} reachable scenes".format(count=len(result_rs["reachableScenes"])))
-                for reachable_scene in result_rs["reachableScenes"]:
+                _LOGGER.debug("adding {count} reachable scenes".format(count=len(result_rs)))
+                for reachable_scene in result_rs:
                     scene_id = reachable_scene
                     scene_name = ALL_SCENES_BYID[scene_id]
 
-                    id = "{zone_id}_{color}_{scene_id}".format(
-                        zone_id=zone_id, color=color, scene_id=scene_id
-                    )
-
                     _LOGGER.debug("adding DSColorScene for reachable scene {scene_name}".format(scene_name=scene_name))
-                    self._scenes[id] = DSColorScene(
-                        client=self,
-                        zone_id=zone_id,
-                        zone_name=zone_name,
-                        scene_id=scene_id,
-                        scene_name=scene_name,
-                        color=color,
+                    apartment.add_scene(
+                        DSColorScene(
+                            client=self,
+                            zone_id=zone_id,
+                            zone_name=zone_name,
+                            scene_id=scene_id,
+                            scene_name=scene_name,
+                            color=color,
+                        ),
+                        group=group,
                     )
 
-    
                 # get custom named scenes
                 _LOGGER.debug("adding custom named scenes")
-                for group_key, group_value in zone_value.items():
-                    # we're only interested in scenes
-                    if not str(group_key).startswith("scene"):
-                        continue
-
-                    scene_id = group_value["scene"]
-                    scene_name = group_value["name"]
-                    id = "{zone_id}_{color}_{scene_id}".format(
-                        zone_id=zone_id, color=color, scene_id=scene_id
+                for scene_data in group_data["scenes"]:
+                    scene_id = scene_data["id"]
+                    scene_name = scene_data["name"]
+                    _LOGGER.debug("adding DSColorScene for custom named scene {zone_id}/{color}/{scene_id}".format(zone_id=zone_id, color=color, scene_id=scene_id))
+                    apartment.add_scene(
+                        DSColorScene(
+                            client=self,
+                            zone_id=zone_id,
+                            zone_name=zone_name,
+                            scene_id=scene_id,
+                            scene_name=scene_name,
+                            color=color,
+                        ),
+                        group=group,
                     )
-                    _LOGGER.debug("adding DSColorScene for custom named scene {id}".format(id=id))
-                    self._scenes[id] = DSColorScene(
-                        client=self,
-                        zone_id=zone_id,
-                        zone_name=zone_name,
-                        scene_id=scene_id,
-                        scene_name=scene_name,
-                        color=color,
-                    )
-        
-        from .devices.meter import DSMeter
-        
-        # get meters
-        response = await self.request(url=self.URL_METERS)
-        if "result" not in response:
-            raise DSCommandFailedException("no result in server response")
-        result = response["result"]
 
-        for meter in result:
+        self.apartment = apartment
 
-            dsuid = meter["name"]
+        for meter in topology["meters"]:
+            dsuid = meter["dSUID"]
             _LOGGER.debug("adding DSMeter with dSUID{dsuid}".format(dsuid=dsuid))
-            dsmeter = DSMeter(client=self, dsuid=dsuid)
-            await dsmeter.async_init()
-            _LOGGER.debug("Async init done for DSMeter {dsuid}".format(dsuid=dsuid))
-            if dsmeter.name == "":
+            if not meter.get("name"):
                 continue
 
-            self._meters[dsuid] = dsmeter
+            self._meters[dsuid] = DSMeter(
+                client=self, dsuid=dsuid, dsid=meter["dSID"], name=meter["name"]
+            )
+
+    async def get_latest_meter_values(self, type: str = "consumption", meters: list = None) -> dict:
+        """
+        get the latest value of several meters with a single request
+
+        :param type: metering type, consumption or energy
+        :param meters: meters to read, defaults to all meters
+        :return: dict of dSUID to latest value, meters missing in the server
+            response are left out
+        """
+        from .commandstack import PRIORITY_BACKGROUND
+
+        if meters is None:
+            meters = list(self._meters.values())
+        # getLatest addresses meters by dSID, meters without one can't be read
+        meters = [meter for meter in meters if meter.unique_id]
+        if not meters:
+            return dict()
+
+        response = await self.stack.submit(
+            url=self.URL_GET_LATEST.format(
+                dsids=",".join(meter.unique_id for meter in meters), type=type
+            ),
+            priority=PRIORITY_BACKGROUND,
+        )
+        if "result" not in response or "values" not in response["result"]:
+            raise DSCommandFailedException("no result in server response")
 
+        # depending on the firmware values are identified by dSID or dSUID
+        meters_by_id = dict()
+        for meter in meters:
+            meters_by_id[meter.unique_id] = meter
+            meters_by_id[meter.dsuid] = meter
+
+        values = dict()
+        for value in response["result"]["values"]:
+            meter = meters_by_id.get(value.get("dSUID")) or meters_by_id.get(
+                value.get("dSID")
+            )
+            if meter is not None and "value" in value:
+                values[meter.dsuid] = value["value"]
+        return values
 
     def get_scenes(self):
-        return self._scenes
+        return self.apartment.scenes
 
     def get_meters(self):
         return self._meters
@@ -0,0 +1,29 @@
+# -*- coding: UTF-8 -*-
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# both decoders raise a subclass of ValueError on invalid input
+DecodeError = ValueError
+
+
+def loads(data):
+    """
+    decode a json document, orjson is used when it is installed
+
+    :param data: bytes or str, bytes are decoded without creating an
+        intermediate str
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def name() -> str:
+    """
+    name of the json library in use
+    """
+    return "orjson" if orjson is not None else "json"
@@ -1,34 +1,365 @@
 import asyncio
+import collections
+import functools
+import itertools
 import logging
+import time
 
 from .client import DSClient
+from .events import ZONE_BROADCAST
+from .exceptions import DSException, DSTimeoutException
+from .ratelimiter import DSRateLimiter
 
 
 _LOGGER = logging.getLogger(__name__)
 
+# user triggered commands are always picked before background reads
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class DSCommand:
+    def __init__(
+        self,
+        url: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        target: tuple = None,
+        future: asyncio.Future = None,
+        timeout: float = 30,
+        lane=None,
+    ):
+        """
+        :param timeout: seconds from now the command has to be done in,
+            including the time it is queued
+        :param lane: commands of the same lane are sent one after another
+        """
+        self.url = url
+        self.priority = priority
+        self.target = target
+        self.future = future
+        self.lane = lane
+        self.superseded = False
+        self.queued = time.monotonic()
+        self.deadline = self.queued + timeout
+
+    @property
+    def cancelled(self) -> bool:
+        return self.superseded or (self.future is not None and self.future.done())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
 class DSCommandStack:
-    def __init__(self, client: DSClient, delay: int = 500):
+    """
+    queue of the requests sent to the server
+
+    commands are sent in lanes, usually one per zone. the commands of a lane
+    are sent one after another in the order they were queued, while up to
+    concurrency lanes are sent at the same time. commands to the whole
+    apartment (zone 0) wait for all lanes and hold back every command queued
+    after them, so they're never reordered against commands to single zones
+    """
+
+    # seconds a command may take from queueing it until it is done, a
+    # command that's still queued by then is dropped
+    COMMAND_TIMEOUT = 30
+
+    def __init__(
+        self,
+        client: DSClient,
+        delay: int = 500,
+        min_delay: int = 100,
+        max_delay: int = 5000,
+        burst: int = 3,
+        concurrency: int = 4,
+    ):
+        """
+        :param delay: initial time between two commands of a lane in ms
+        :param concurrency: number of lanes sent at the same time
+        """
         self._client = client
-        self._stack = list()
+        self._queue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._pending = dict()
         self._task = None
-        self._delay = delay
 
-    async def append(self, url: str):
-        self._stack.append(url)
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        # busy lane to the commands queued behind the one being sent
+        self._lanes = dict()
+        self._workers = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # adapt the command rate to how fast the server answers requests
+        self.limiter = DSRateLimiter(
+            interval=delay,
+            min_interval=min_delay,
+            max_interval=max_delay,
+            burst=burst,
+            lanes=concurrency,
+        )
+        self._client.add_request_listener(self.limiter.record)
+
+    @property
+    def coalesced(self) -> int:
+        return self._client.metrics.commands_coalesced
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + sum(len(waiting) for waiting in self._lanes.values())
+
+    @property
+    def lanes_busy(self) -> int:
+        return len(self._lanes)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def append(
+        self,
+        url: str,
+        target: tuple = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: float = None,
+        lane=None,
+    ):
+        """
+        queue a command for execution
+
+        :param url: URL path to request
+        :param target: what the command sets the state of, a pending command
+            for the same target is dropped in favour of the new one
+        :param priority: priority of the command
+        :param timeout: seconds the command may take including the time it's
+            queued, defaults to COMMAND_TIMEOUT
+        :param lane: what the command's order matters for, usually the zone
+            id. commands without a lane share one
+        """
+        command = DSCommand(
+            url=url,
+            priority=priority,
+            target=target,
+            timeout=timeout or self.COMMAND_TIMEOUT,
+            lane=lane,
+        )
+        if target is not None:
+            previous = self._pending.get(target)
+            if previous is not None:
+                previous.superseded = True
+                self._client.metrics.commands_coalesced += 1
+                _LOGGER.debug(
+                    f"Command {previous.url} superseded by {url}, "
+                    f"{self.coalesced} commands coalesced so far"
+                )
+            self._pending[target] = command
+
+        self._put(command)
+
+    async def submit(
+        self,
+        url: str,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: float = None,
+        lane=None,
+    ):
+        """
+        queue a request and wait for its response, cancelling the wait also
+        cancels the request
+
+        :param url: URL path to request
+        :param priority: priority of the request
+        :param timeout: seconds the request may take including the time it's
+            queued, defaults to COMMAND_TIMEOUT
+        :param lane: what the request's order matters for
+        :return: json response
+        :raises: DSTimeoutException
+        """
+        timeout = timeout or self.COMMAND_TIMEOUT
+
+        # nothing would pick the request up, e.g. during initialization
+        if self._task is None:
+            return await self._client.request(
+                url=url, deadline=time.monotonic() + timeout
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        self._put(
+            DSCommand(url=url, priority=priority, future=future, timeout=timeout, lane=lane)
+        )
+        return await future
+
+    def _put(self, command: DSCommand) -> None:
+        # the sequence keeps commands of the same priority in order
+        self._queue.put_nowait((command.priority, next(self._sequence), command))
+        self._client.metrics.record_queue_depth(self.queue_depth)
 
     async def execute(self):
         while True:
-            # check for command to execute
-            if len(self._stack) > 0:
-                _LOGGER.debug("Command Stack not empty, executing next request")
-                await self._client.request(url=self._stack.pop(0))
+            # wait for a free slot before picking the next command, so the
+            # most urgent one queued by then is sent
+            await self._slots.acquire()
+            command = None
+            worker = None
+            try:
+                command = await self._get()
+
+                waiting = self._lanes.get(command.lane)
+                if waiting is not None:
+                    # the lane is busy, queue the command behind the one
+                    # being sent to keep their order
+                    waiting.append(command)
+                    self._slots.release()
+                    continue
+
+                if command.lane == ZONE_BROADCAST:
+                    await self._idle.wait()
+
+                _LOGGER.debug(f"Starting lane {command.lane}")
+                self._lanes[command.lane] = collections.deque()
+                self._idle.clear()
+                # the lane worker releases the slot when it's done
+                worker = asyncio.ensure_future(self._run_lane(command))
+                self._workers.add(worker)
+                worker.add_done_callback(self._workers.discard)
+
+                if command.lane == ZONE_BROADCAST:
+                    await asyncio.wait((worker,))
+            except asyncio.CancelledError:
+                # stopped before a lane worker took the slot over
+                if worker is None:
+                    self._slots.release()
+                    if command is not None:
+                        self._abort(command)
+                        self._queue.task_done()
+                raise
+
+    async def _get(self) -> DSCommand:
+        # skip commands that were superseded, whose caller gave up on them or
+        # that waited too long to still be of use
+        while True:
+            priority, sequence, command = await self._queue.get()
+            self._client.metrics.record_queue_depth(self.queue_depth)
+            if not self._skip(command):
+                return command
+            self._queue.task_done()
+
+    def _skip(self, command: DSCommand) -> bool:
+        if command.cancelled:
+            return True
+        if command.expired:
+            self._expire(command)
+            return True
+        return False
+
+    async def _run_lane(self, command: DSCommand) -> None:
+        lane = command.lane
+        waiting = self._lanes[lane]
+        try:
+            while True:
+                try:
+                    await self.limiter.acquire(lane=lane)
+                    # a newer command may have superseded this one meanwhile
+                    if not self._skip(command):
+                        await self._send(command)
+                finally:
+                    self._queue.task_done()
 
-            # sleep for x ms before next execution to not overload the DS server
-            await asyncio.sleep(self._delay / 1000)
+                while waiting:
+                    command = waiting.popleft()
+                    self._client.metrics.record_queue_depth(self.queue_depth)
+                    if not self._skip(command):
+                        break
+                    self._queue.task_done()
+                else:
+                    return
+        finally:
+            if self._lanes.get(lane) is waiting:
+                del self._lanes[lane]
+            if not self._lanes:
+                self._idle.set()
+            self._slots.release()
+
+    async def _send(self, command: DSCommand) -> None:
+        if command.target is not None and self._pending.get(command.target) is command:
+            del self._pending[command.target]
+
+        self._client.metrics.queue_wait.observe(
+            (time.monotonic() - command.queued) * 1000
+        )
+
+        _LOGGER.debug(f"Sending command {command.url}")
+        request = asyncio.ensure_future(
+            self._client.request(url=command.url, deadline=command.deadline)
+        )
+        if command.future is not None:
+            # stop the request when its caller gives up waiting for it
+            command.future.add_done_callback(
+                functools.partial(self._cancel_abandoned, request)
+            )
+        try:
+            # unlike awaiting the request, waiting for it doesn't raise when
+            # only the request was cancelled
+            await asyncio.wait((request,))
+        except asyncio.CancelledError:
+            # the stack was stopped
+            request.cancel()
+            self._abort(command)
+            raise
+
+        if request.cancelled():
+            _LOGGER.debug(f"Command {command.url} cancelled by its caller")
+            return
+
+        e = request.exception()
+        if e is not None:
+            if command.future is None:
+                _LOGGER.warning(f"Command {command.url} failed: {e!r}")
+            elif not command.future.done():
+                command.future.set_exception(e)
+        elif command.future is not None and not command.future.done():
+            command.future.set_result(request.result())
+
+    @staticmethod
+    def _cancel_abandoned(request: asyncio.Future, future: asyncio.Future) -> None:
+        if future.cancelled():
+            request.cancel()
+
+    @staticmethod
+    def _abort(command: DSCommand) -> None:
+        # the caller didn't give up, tell it why there's no response
+        if command.future is not None and not command.future.done():
+            command.future.set_exception(DSException("command stack stopped"))
+
+    def _expire(self, command: DSCommand) -> None:
+        _LOGGER.warning(f"Command {command.url} dropped, it timed out in the queue")
+        if command.target is not None and self._pending.get(command.target) is command:
+            del self._pending[command.target]
+        if command.future is not None:
+            command.future.set_exception(DSTimeoutException("command timed out in the queue"))
 
     async def start(self):
-        self.task = asyncio.Task(self.execute())
+        self._task = asyncio.Task(self.execute())
 
     async def stop(self):
-        if self.task:
-            self.task.cancel()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # the stack doesn't wait for the requests being sent anymore
+        for worker in list(self._workers):
+            worker.cancel()
+
+        # don't leave callers waiting for requests that won't be sent anymore
+        waiting = [command for commands in self._lanes.values() for command in commands]
+        while not self._queue.empty():
+            priority, sequence, command = self._queue.get_nowait()
+            waiting.append(command)
+        for command in waiting:
+            self._abort(command)
+            self._queue.task_done()
+        self._lanes.clear()
+        self._pending.clear()
+        self._client.metrics.record_queue_depth(0)
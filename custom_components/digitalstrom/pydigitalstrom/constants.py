@@ -96,6 +96,40 @@ for scene_type, scenes in SCENES.items():
         ALL_SCENES_BYNAME[scene_name] = scene_id
         ALL_SCENES_BYID[scene_id] = scene_name
 
+# scenes that set an absolute state for an area of a zone/group (0 being the
+# whole group), a newer call for the same area supersedes a pending older one
+# stepping and group independent scenes are left out since they don't
+SCENE_TARGET_AREAS = {}
+
+for scene_name, scene_id in SCENES["PRESET"].items():
+    SCENE_TARGET_AREAS[scene_id] = 0
+
+for area in range(1, 5):
+    SCENE_TARGET_AREAS[SCENES["AREA"][f"SCENE_AREA{area}_OFF"]] = area
+    SCENE_TARGET_AREAS[SCENES["AREA"][f"SCENE_AREA{area}_ON"]] = area
+
+# turn off scene to turn on scene of a zone/group or one of its areas
+SCENE_ON_OFF_PAIRS = {
+    SCENES["PRESET"]["SCENE_PRESET0"]: SCENES["PRESET"]["SCENE_PRESET1"],
+}
+
+for area in range(1, 5):
+    SCENE_ON_OFF_PAIRS[SCENES["AREA"][f"SCENE_AREA{area}_OFF"]] = SCENES["AREA"][f"SCENE_AREA{area}_ON"]
+
+# turn off scene to the presets X2-X4 of the same preset row
+SCENE_PRESET_EFFECTS = {
+    SCENES["PRESET"][f"SCENE_PRESET{row}0"]: tuple(
+        SCENES["PRESET"][f"SCENE_PRESET{row}{preset}"] for preset in range(2, 5)
+    )
+    for row in ("", "1", "2", "3", "4")
+}
+
+# group independent scene entering a state to the one leaving it
+SCENE_STATE_PAIRS = {
+    SCENES["GROUP_INDIPENDENT"]["SCENE_SLEEPING"]: SCENES["GROUP_INDIPENDENT"]["SCENE_WAKEUP"],
+    SCENES["GROUP_INDIPENDENT"]["SCENE_PRESENT"]: SCENES["GROUP_INDIPENDENT"]["SCENE_ABSENT"],
+}
+
 
 GROUP_LIGHTS = 1
 GROUP_BLINDS = 2
@@ -1,15 +1,22 @@
+import sys
+
 from ..client import DSClient
 
 
 class DSDevice(object):
     ID_FIELD = "id"
 
+    # there are thousands of devices in large apartments, don't give each of
+    # them a __dict__
+    __slots__ = ("_client", "_id", "_name", "_zone_id", "_zone_name")
+
     def __init__(self, client: DSClient, device_id, device_name, zone_id, zone_name, *args, **kwargs):
         self._client = client
         self._id = device_id
         self._name = device_name
         self._zone_id = zone_id
-        self._zone_name = zone_name
+        # all devices of a zone share one name string
+        self._zone_name = sys.intern(zone_name) if isinstance(zone_name, str) else zone_name
 
     def __str__(self):
         return '<{type} {id} "{name}">'.format(
@@ -32,5 +39,12 @@ class DSDevice(object):
     def unique_id(self):
         return self._id
 
-    async def request(self, url: str, **kwargs):
-        await self._client.stack.append(url=url.format(**kwargs))
+    @property
+    def available(self) -> bool:
+        return self._client.available
+
+    async def request(self, url: str, target: tuple = None, **kwargs):
+        # commands to a zone keep their order, other zones are sent meanwhile
+        await self._client.stack.append(
+            url=url.format(**kwargs), target=target, lane=self._zone_id
+        )
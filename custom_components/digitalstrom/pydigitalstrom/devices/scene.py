@@ -1,5 +1,6 @@
 # -*- coding: UTF-8 -*-
 from ..client import DSClient
+from ..constants import SCENE_TARGET_AREAS
 from ..devices.base import DSDevice
 
 
@@ -8,6 +9,8 @@ class DSScene(DSDevice):
         "/json/zone/callScene?id={zone_id}&" "sceneNumber={scene_id}&force=true"
     )
 
+    __slots__ = ("_scene_id", "_scene_name")
+
     def __init__(
         self,
         client: DSClient,
@@ -19,17 +22,11 @@ class DSScene(DSDevice):
         **kwargs
     ):
         self._scene_id = scene_id
-        self._scene_name = scene_name.replace("SCENE_","").title()
-
-        device_id = "{zone_id}_{scene_id}".format(
-            zone_id=zone_id, scene_id=self._scene_id
-        )
-        device_name = "{zone} / {name}".format(
-            zone=zone_name, name=self._scene_name
-        )
+        self._scene_name = scene_name
 
+        # id and name are formatted on demand, most scenes never need them
         super().__init__(
-            client=client, device_id=device_id, device_name=device_name, zone_name=zone_name, zone_id=zone_id, *args, **kwargs
+            client=client, device_id=None, device_name=None, zone_name=zone_name, zone_id=zone_id, *args, **kwargs
         )
 
     async def turn_on(self):
@@ -37,9 +34,19 @@ class DSScene(DSDevice):
             url=self.URL_TURN_ON.format(zone_id=self._zone_id, scene_id=self._scene_id)
         )
 
+    @property
+    def unique_id(self):
+        return "{zone_id}_{scene_id}".format(
+            zone_id=self._zone_id, scene_id=self._scene_id
+        )
+
+    @property
+    def name(self):
+        return "{zone} / {name}".format(zone=self._zone_name, name=self.scene_name)
+
     @property
     def scene_name(self):
-        return self._scene_name
+        return self._scene_name.replace("SCENE_","").title()
     
     @property
     def scene_id(self):
@@ -52,6 +59,8 @@ class DSColorScene(DSDevice):
         "sceneNumber={scene_id}&groupID={color}&force=true"
     )
 
+    __slots__ = ("_scene_id", "_scene_name", "_color")
+
     def __init__(
         self,
         client: DSClient,
@@ -64,30 +73,46 @@ class DSColorScene(DSDevice):
         **kwargs
     ):
         self._scene_id = scene_id
-        self._scene_name = scene_name.replace("SCENE_","").title()
+        self._scene_name = scene_name
         self._color = color
 
-        device_id = "{zone_id}_{color}_{scene_id}".format(
-            zone_id=zone_id, color=self._color, scene_id=self._scene_id
-        )
-        device_name = "{zone} / {name}".format(
-            zone=zone_name, name=self._scene_name
-        )
-
+        # id and name are formatted on demand, most scenes never need them
         super().__init__(
-            client=client, device_id=device_id, device_name=device_name, zone_name=zone_name, zone_id=zone_id, *args, **kwargs
+            client=client, device_id=None, device_name=None, zone_name=zone_name, zone_id=zone_id, *args, **kwargs
         )
 
     async def turn_on(self):
         await self.request(
             url=self.URL_TURN_ON.format(
                 zone_id=self._zone_id, color=self._color, scene_id=self._scene_id
-            )
+            ),
+            target=self.target,
+        )
+
+    @property
+    def target(self):
+        """
+        the zone/group area this scene sets the state of, None if calling it
+        doesn't supersede other scene calls
+        """
+        area = SCENE_TARGET_AREAS.get(self._scene_id)
+        if area is None:
+            return None
+        return (self._zone_id, self._color, area)
+
+    @property
+    def unique_id(self):
+        return "{zone_id}_{color}_{scene_id}".format(
+            zone_id=self._zone_id, color=self._color, scene_id=self._scene_id
         )
 
+    @property
+    def name(self):
+        return "{zone} / {name}".format(zone=self._zone_name, name=self.scene_name)
+
     @property
     def scene_name(self):
-        return self._scene_name
+        return self._scene_name.replace("SCENE_","").title()
     
     @property
     def scene_id(self):
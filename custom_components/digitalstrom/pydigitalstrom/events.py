@@ -0,0 +1,51 @@
+# -*- coding: UTF-8 -*-
+
+# zone id of scenes called for the whole apartment
+ZONE_BROADCAST = 0
+
+
+class DSEvent:
+    def __init__(self, name: str, properties: dict, source: dict = None):
+        """
+        :param name: name of the event, e.g. callScene
+        :param properties: properties sent with the event
+        :param source: source device of the event
+        """
+        self.name = name
+        self.properties = properties
+        self.source = source or dict()
+
+        # the ids come in as strings, cast them once for every subscriber
+        self.zone_id = self._get_int("zoneID")
+        self.group_id = self._get_int("groupID")
+        self.scene_id = self._get_int("sceneID")
+
+    def _get_int(self, key: str):
+        try:
+            return int(self.properties[key])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def is_broadcast(self) -> bool:
+        return self.zone_id == ZONE_BROADCAST
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        parse and validate an event as sent by the websocket
+
+        :param data: decoded json message
+        :return: event or None if the message isn't a valid event
+        """
+        if not isinstance(data, dict) or "name" not in data:
+            return None
+
+        properties = data.get("properties", dict())
+        if not isinstance(properties, dict):
+            return None
+
+        return cls(name=data["name"], properties=properties, source=data.get("source"))
+
+    def __repr__(self) -> str:
+        return f"DSEvent(name={self.name!r}, properties={self.properties!r})"
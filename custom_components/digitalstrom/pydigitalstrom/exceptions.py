@@ -11,3 +11,15 @@ class DSRequestException(DSException):
 
 class DSCommandFailedException(DSException):
     pass
+
+
+class DSAuthenticationException(DSRequestException):
+    pass
+
+
+class DSCircuitOpenException(DSRequestException):
+    pass
+
+
+class DSTimeoutException(DSRequestException):
+    pass
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+from .client import DSClient
+from .exceptions import DSException
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSMeterCoordinator:
+    TYPES = ("consumption", "energy")
+
+    def __init__(self, client: DSClient, interval: int = 30):
+        """
+        :param client: client to read the meters with
+        :param interval: seconds between two polling cycles
+        """
+        self._client = client
+        self._interval = interval
+        self._task = None
+
+        self._values = dict()
+        self._callbacks = dict()
+
+    @property
+    def interval(self) -> int:
+        return self._interval
+
+    def register(self, dsuid: str, type: str, callback: callable) -> callable:
+        """
+        get notified when the value of a meter changes
+
+        :param dsuid: dSUID of the meter
+        :param type: metering type, consumption or energy
+        :param callback: coroutine function called with the new value
+        :return: function to unregister the callback again
+        """
+        callbacks = self._callbacks.setdefault((dsuid, type), [])
+        callbacks.append(callback)
+        return lambda: callbacks.remove(callback)
+
+    def get_value(self, dsuid: str, type: str):
+        """
+        latest known value of a meter, None if it wasn't polled yet
+        """
+        return self._values.get((dsuid, type))
+
+    async def refresh(self) -> None:
+        """
+        poll all meters for all metering types once and notify the callbacks
+        of the values that changed
+        """
+        for type in self.TYPES:
+            values = await self._client.get_latest_meter_values(type=type)
+            for dsuid, value in values.items():
+                if self._values.get((dsuid, type)) == value:
+                    continue
+                self._values[(dsuid, type)] = value
+
+                for callback in list(self._callbacks.get((dsuid, type), [])):
+                    # one broken sensor mustn't keep the others from updating
+                    try:
+                        await callback(value=value)
+                    except Exception:
+                        _LOGGER.exception(f"Meter callback failed for {dsuid} {type}")
+
+    async def execute(self):
+        while True:
+            try:
+                await self.refresh()
+            except DSException as e:
+                _LOGGER.warning(f"Polling meters failed: {e!r}")
+            except Exception:
+                # keep polling, the next cycle may well succeed
+                _LOGGER.exception("Polling meters failed unexpectedly")
+
+            await asyncio.sleep(self._interval)
+
+    async def start(self):
+        self._task = asyncio.Task(self.execute())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
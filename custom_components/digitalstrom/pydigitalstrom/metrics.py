@@ -0,0 +1,205 @@
+import bisect
+import collections
+import time
+
+
+class DSHistogram:
+    # upper bounds of the buckets in ms, the last one catches everything
+    BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        :param value: duration in ms
+        """
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def percentile(self, percent: float):
+        """
+        upper bound of the bucket the percentile falls into, None without
+        any values
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return dict(
+            count=self.count,
+            mean=self.mean,
+            p50=self.percentile(50),
+            p95=self.percentile(95),
+            max=self.max,
+            buckets={
+                str(bound): count
+                for bound, count in zip(self.BUCKETS, self.counts)
+                if count
+            },
+        )
+
+
+class DSRate:
+    def __init__(self, window: int = 60):
+        """
+        :param window: seconds to average the rate over
+        """
+        self._window = window
+        # [second, count] of the last seconds with events
+        self._seconds = collections.deque()
+        self.total = 0
+
+    def mark(self, count: int = 1) -> None:
+        now = int(time.monotonic())
+        if self._seconds and self._seconds[-1][0] == now:
+            self._seconds[-1][1] += count
+        else:
+            self._seconds.append([now, count])
+        self.total += count
+        self._expire(now)
+
+    def _expire(self, now: int) -> None:
+        while self._seconds and self._seconds[0][0] <= now - self._window:
+            self._seconds.popleft()
+
+    @property
+    def rate(self) -> float:
+        """
+        events per second over the window
+        """
+        self._expire(int(time.monotonic()))
+        return sum(count for second, count in self._seconds) / self._window
+
+
+class DSEndpointMetrics:
+    def __init__(self):
+        self.latency = DSHistogram()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def as_dict(self) -> dict:
+        return dict(
+            requests=self.requests,
+            retries=self.retries,
+            failures=self.failures,
+            latency=self.latency.as_dict(),
+        )
+
+
+class DSMetrics:
+    """
+    counters and timings of the communication with the server, cheap enough
+    to be always on
+    """
+
+    # number of requests kept with their details
+    RECENT_REQUESTS = 50
+
+    def __init__(self):
+        self.endpoints = dict()
+        self.recent_requests = collections.deque(maxlen=self.RECENT_REQUESTS)
+
+        self.queue_wait = DSHistogram()
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.commands_coalesced = 0
+
+        self.token_refreshes = 0
+
+        self.websocket_reconnects = 0
+        self.events = DSRate()
+
+    def record_request(self, url: str, latency: float, attempts: int, exception: Exception = None) -> None:
+        """
+        count a finished request for its endpoint and keep it in the recent
+        requests, every request handler reports its requests here
+        """
+        endpoint = url.split("?", 1)[0]
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = DSEndpointMetrics()
+
+        metrics.requests += 1
+        metrics.retries += max(attempts - 1, 0)
+        if exception is not None:
+            metrics.failures += 1
+        metrics.latency.observe(latency * 1000)
+
+        self.recent_requests.append(
+            dict(
+                time=time.time(),
+                endpoint=endpoint,
+                latency=round(latency * 1000, 1),
+                attempts=attempts,
+                error=repr(exception) if exception is not None else None,
+            )
+        )
+
+    def record_queue_depth(self, depth: int) -> None:
+        self.queue_depth = depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+    @property
+    def requests(self) -> int:
+        return sum(metrics.requests for metrics in self.endpoints.values())
+
+    @property
+    def retries(self) -> int:
+        return sum(metrics.retries for metrics in self.endpoints.values())
+
+    @property
+    def failures(self) -> int:
+        return sum(metrics.failures for metrics in self.endpoints.values())
+
+    @property
+    def request_latency(self):
+        """
+        mean latency of all requests in ms
+        """
+        count = sum(metrics.latency.count for metrics in self.endpoints.values())
+        if not count:
+            return None
+        return sum(metrics.latency.sum for metrics in self.endpoints.values()) / count
+
+    def as_dict(self) -> dict:
+        return dict(
+            requests=dict(
+                total=self.requests,
+                retries=self.retries,
+                failures=self.failures,
+                endpoints={
+                    endpoint: metrics.as_dict()
+                    for endpoint, metrics in self.endpoints.items()
+                },
+            ),
+            queue=dict(
+                depth=self.queue_depth,
+                depth_max=self.queue_depth_max,
+                coalesced=self.commands_coalesced,
+                wait=self.queue_wait.as_dict(),
+            ),
+            token_refreshes=self.token_refreshes,
+            websocket=dict(
+                reconnects=self.websocket_reconnects,
+                events=self.events.total,
+                events_per_second=self.events.rate,
+            ),
+        )
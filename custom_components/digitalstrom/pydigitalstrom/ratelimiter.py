@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+
+from .exceptions import DSAuthenticationException, DSCommandFailedException
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSRateLimiter:
+    """
+    token buckets limiting how fast commands are sent to the server
+
+    every lane (e.g. zone) gets one token every interval and keeps up to
+    burst tokens, so an idle lane sends a few commands at once. every
+    command also takes a token from a bucket shared by all lanes, which
+    gets one token per lane every interval, so the rate the server gets is
+    bounded however many lanes there are. the interval adapts to the
+    observed responses: every normal response shortens it a little, while a
+    response much slower than the average, a retry or a failed request
+    lengthens it, always staying within the configured bounds and draining
+    all buckets
+    """
+
+    # interval step in ms for every normal response
+    SPEEDUP_STEP = 25
+    # interval factor for every slow or failed response
+    SLOWDOWN_FACTOR = 1.5
+    # responses this many times slower than the average count as slow
+    SLOW_RATIO = 2
+    # weight of a new response in the average latency
+    LATENCY_WEIGHT = 0.2
+
+    def __init__(
+        self,
+        interval: int = 500,
+        min_interval: int = 100,
+        max_interval: int = 5000,
+        burst: int = 3,
+        target_latency: int = 250,
+        lanes: int = 1,
+    ):
+        """
+        :param interval: initial time between two commands of a lane in ms
+        :param min_interval: shortest time between two commands in ms
+        :param max_interval: longest time between two commands in ms
+        :param burst: number of commands a lane may send at once when idle
+        :param lanes: number of lanes sending at the same time, the server
+            gets up to this many times the rate of a single lane
+        :param target_latency: responses faster than this in ms never count
+            as slow
+        """
+        self._min_interval = min(min_interval, interval)
+        self._max_interval = max(max_interval, interval)
+        self._interval = interval
+        self._burst = burst
+        self._target_latency = target_latency
+        self._lanes = lanes
+
+        # [tokens, last refill] shared by all lanes
+        self._shared = [float(burst * lanes), time.monotonic()]
+        # lane to [tokens, last refill], lanes with a full bucket are left out
+        self._buckets = dict()
+        self._latency = None
+
+    @property
+    def interval(self) -> int:
+        """
+        current time between two commands in ms
+        """
+        return self._interval
+
+    @property
+    def latency(self):
+        """
+        average response time in ms, None until the first response
+        """
+        return self._latency
+
+    def _refill(self, bucket: list, lanes: int = 1) -> None:
+        """
+        :param lanes: number of lanes the bucket is filled for
+        """
+        now = time.monotonic()
+        bucket[0] = min(
+            self._burst * lanes, bucket[0] + (now - bucket[1]) * 1000 * lanes / self._interval
+        )
+        bucket[1] = now
+
+    async def acquire(self, lane=None) -> None:
+        """
+        wait until the next command of a lane may be sent
+
+        :param lane: lane the command is sent in
+        """
+        while True:
+            self._refill(self._shared, lanes=self._lanes)
+            bucket = self._buckets.get(lane)
+            if bucket is None:
+                # a new lane gets no more than the server may take right
+                # now, so it doesn't burst while the server is struggling
+                bucket = self._buckets[lane] = [
+                    min(self._burst, self._shared[0]), time.monotonic()
+                ]
+            self._refill(bucket)
+
+            if bucket[0] >= 1 and self._shared[0] >= 1:
+                bucket[0] -= 1
+                self._shared[0] -= 1
+                return
+            # sleep until both buckets have a token again
+            await asyncio.sleep(
+                max(
+                    (1 - bucket[0]) * self._interval,
+                    (1 - self._shared[0]) * self._interval / self._lanes,
+                )
+                / 1000
+            )
+
+    def record(self, url: str, latency: float, attempts: int, exception: Exception = None) -> None:
+        """
+        adapt the rate to a finished request, the command stack has its
+        client report every request here, not only the commands it sends
+
+        :param url: requested URL path
+        :param latency: time the request took including retries in seconds
+        :param attempts: number of attempts the request needed
+        :param exception: exception the request failed with
+        """
+        latency = latency * 1000
+        # rejected tokens and failed commands don't tell anything about load
+        overloaded = attempts > 1 or (
+            exception is not None
+            and not isinstance(
+                exception, (DSAuthenticationException, DSCommandFailedException)
+            )
+        )
+        if not overloaded:
+            if self._latency is None:
+                self._latency = latency
+            overloaded = latency > max(
+                self._target_latency, self._latency * self.SLOW_RATIO
+            )
+            self._latency += (latency - self._latency) * self.LATENCY_WEIGHT
+
+        # settle the tokens earned at the old rate before changing it, lanes
+        # that are idle long enough to have a full bucket are forgotten
+        self._refill(self._shared, lanes=self._lanes)
+        for lane, bucket in list(self._buckets.items()):
+            self._refill(bucket)
+            if bucket[0] >= self._burst:
+                del self._buckets[lane]
+        if overloaded:
+            self._interval = min(
+                self._max_interval, round(self._interval * self.SLOWDOWN_FACTOR)
+            )
+            # no bursts while the server is struggling
+            self._shared[0] = min(self._shared[0], 0.0)
+            for lane in self._buckets:
+                self._buckets[lane][0] = min(self._buckets[lane][0], 0.0)
+            _LOGGER.debug(f"Server slow on {url}, interval now {self._interval} ms")
+        else:
+            self._interval = max(
+                self._min_interval, self._interval - self.SPEEDUP_STEP
+            )
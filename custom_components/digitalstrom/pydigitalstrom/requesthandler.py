@@ -1,30 +1,93 @@
-import json
 import logging
+import time
 
 import aiohttp
 import asyncio
 import socket
-from .exceptions import DSCommandFailedException, DSRequestException
+from . import codec
+from .circuitbreaker import DSCircuitBreaker, STATE_OPEN
+from .exceptions import (
+    DSAuthenticationException,
+    DSCommandFailedException,
+    DSRequestException,
+    DSTimeoutException,
+)
+from .metrics import DSMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class DSRequestHandler:
-    def __init__(self, host: str, port: str, loop: asyncio.AbstractEventLoop = None):
+    # seconds a resolved dSS address is kept in the connector dns cache
+    DNS_CACHE_TTL = 300
+    # seconds an idle pooled connection is kept open for reuse
+    KEEPALIVE_TIMEOUT = 30
+    # seconds a single attempt of a request may take
+    REQUEST_TIMEOUT = 10
+    # seconds a request may take including all retries
+    REQUEST_BUDGET = 30
+
+    def __init__(
+        self,
+        host: str,
+        port: str,
+        loop: asyncio.AbstractEventLoop = None,
+        session: aiohttp.ClientSession = None,
+        pool_size: int = 10,
+    ):
         self.host = host
         self.port = port
         self.loop = loop
+        self.pool_size = pool_size
+
+        # an externally provided session (e.g. the one shared by home
+        # assistant) is reused but never closed by us
+        self._session = session
+        self._owns_session = session is None
+
+        self._request_listeners = []
+
+        # timings and counters of the communication with the server
+        self.metrics = DSMetrics()
+        self.add_request_listener(self.metrics.record_request)
 
-    async def raw_request(self, url: str, retries : int = 2, interval = 0.9, backoff = 3, **kwargs) -> str:
+        # fail fast instead of piling up retries while the server is down
+        self.circuit = DSCircuitBreaker()
+
+    async def raw_request(
+        self,
+        url: str,
+        retries : int = 2,
+        interval = 0.9,
+        backoff = 3,
+        timeout: float = None,
+        deadline: float = None,
+        **kwargs
+    ) -> str:
         """
         run a raw request against the digitalstrom server
 
         :param url: URL path to request
+        :param timeout: seconds a single attempt may take, defaults to
+            REQUEST_TIMEOUT
+        :param deadline: time.monotonic() by which the request including all
+            retries has to be done, defaults to REQUEST_BUDGET from now
         :param kwargs: kwargs to be forwarded to aiohttp.get
         :return: json response
         :raises: DSRequestException
+        :raises: DSAuthenticationException
         :raises: DSCommandFailedException
+        :raises: DSCircuitOpenException
+        :raises: DSTimeoutException
         """
+        probe = self.circuit.before_request()
+
+        if timeout is None:
+            timeout = self.REQUEST_TIMEOUT
+        if deadline is None:
+            deadline = time.monotonic() + self.REQUEST_BUDGET
+
+        path = url
         url = f"https://{self.host}:{self.port}{url}"
 
         if retries == -1:  # -1 means retry indefinitely
@@ -37,41 +100,140 @@ class DSRequestHandler:
         backoff_interval = interval
         raised_exc = None
 
-        while attempt != 0:
+        started = time.monotonic()
+        attempts = 0
+        error = None
+        cancelled = False
+        try:
+            while attempt != 0:
 
-            if raised_exc:
-                _LOGGER.debug('caught "%s" url:%s , remaining tries %s, '
-                    'sleeping %.2fsecs', raised_exc, url,
-                    attempt, backoff_interval)
-                await asyncio.sleep(backoff_interval)
-                # bump interval for the next possible attempt
-                backoff_interval = backoff_interval * backoff
+                if raised_exc:
+                    # other requests found the server down in the meantime
+                    if self.circuit.state == STATE_OPEN:
+                        break
+                    # no time left for another attempt
+                    if time.monotonic() + backoff_interval >= deadline:
+                        raise DSTimeoutException("request deadline exceeded") from raised_exc
+
+                    _LOGGER.debug('caught "%s" url:%s , remaining tries %s, '
+                        'sleeping %.2fsecs', raised_exc, url,
+                        attempt, backoff_interval)
+                    await asyncio.sleep(backoff_interval)
+                    # bump interval for the next possible attempt
+                    backoff_interval = backoff_interval * backoff
 
-            _LOGGER.debug("Raw Request to {url}, remaining attempts {attempt} of {retries}".format(url = url, attempt = attempt - 1, retries = retries))
+                _LOGGER.debug("Raw Request to {url}, remaining attempts {attempt} of {retries}".format(url = url, attempt = attempt - 1, retries = retries))
 
-            # disable ssl verification for most servers miss valid certificates
-            async with await self.get_aiohttp_session() as session:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DSTimeoutException("request deadline exceeded") from raised_exc
+
+                attempts += 1
+                session = await self.get_session()
                 try:
-                    async with session.get(url=url, **kwargs) as response:
+                    async with session.get(
+                        url=url,
+                        timeout=aiohttp.ClientTimeout(total=min(timeout, remaining)),
+                        **kwargs
+                    ) as response:
+                        # the session token was rejected
+                        if response.status in (401, 403):
+                            raise DSAuthenticationException("authentication failed")
+
                         # check for server errors
                         if not response.status == 200:
                             raise DSRequestException(response.text)
 
+                        # decode straight from the body bytes, which skips
+                        # building a str of large topology responses
                         try:
-                            data = await response.json()
-                        except json.decoder.JSONDecodeError:
+                            data = codec.loads(await response.read())
+                        except codec.DecodeError:
                             raise DSRequestException("failed to json decode response")
                         if "ok" not in data or not data["ok"]:
                             raise DSCommandFailedException()
                         return data
+                except asyncio.TimeoutError:
+                    raised_exc = DSTimeoutException("request timed out")
                 except aiohttp.ClientError:
                     # Only retry on this Error
                     raised_exc = DSRequestException("request failed")
 
-            attempt -= 1
+                attempt -= 1
+
+            if raised_exc:
+                raise raised_exc
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._update_circuit(error=error, cancelled=cancelled, probe=probe)
+            self._notify_request_listeners(
+                url=path,
+                latency=time.monotonic() - started,
+                attempts=attempts,
+                exception=error,
+            )
+
+    @property
+    def available(self) -> bool:
+        """
+        if requests are sent to the server, False while the circuit is open
+        """
+        return self.circuit.closed
+
+    def _update_circuit(self, error: Exception, cancelled: bool, probe) -> None:
+        if cancelled:
+            self.circuit.release(ticket=probe)
+        # the server answered, even if it didn't like the request
+        elif error is None or isinstance(
+            error, (DSAuthenticationException, DSCommandFailedException)
+        ):
+            self.circuit.record_success(ticket=probe)
+        else:
+            self.circuit.record_failure(ticket=probe)
+
+    def add_request_listener(self, callback: callable) -> None:
+        """
+        register a callback that is called after every request with the
+        requested url path, the time it took including retries in seconds,
+        the number of attempts and the exception it failed with, if any
+        """
+        self._request_listeners.append(callback)
+
+    def remove_request_listener(self, callback: callable) -> None:
+        self._request_listeners.remove(callback)
 
-        if raised_exc:
-            raise raised_exc
+    def _notify_request_listeners(self, **kwargs) -> None:
+        for callback in self._request_listeners:
+            try:
+                callback(**kwargs)
+            except Exception:
+                _LOGGER.exception("Request listener failed")
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        get the long-lived client session used for all requests against the
+        server, it is created on first use and keeps its connections alive
+        so consecutive requests skip the tcp and tls handshake
+
+        :return the pooled aiohttp client session
+        """
+        if self._session is None or self._session.closed:
+            self._session = await self.get_aiohttp_session()
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """
+        close the pooled client session and all of its connections
+        """
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
 
     async def get_aiohttp_session(self, cookies: dict = None) -> aiohttp.ClientSession:
         """
@@ -82,7 +244,13 @@ class DSRequestHandler:
         :return the initialized aiohttp client session
         """
         return aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(family=socket.AF_INET, ssl=False),
+            connector=aiohttp.TCPConnector(
+                family=socket.AF_INET,
+                ssl=False,
+                limit=self.pool_size,
+                ttl_dns_cache=self.DNS_CACHE_TTL,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+            ),
             cookies=cookies,
             loop=self.loop,
         )
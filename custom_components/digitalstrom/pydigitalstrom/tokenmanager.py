@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+
+from .exceptions import DSException
+from .requesthandler import DSRequestHandler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSTokenManager:
+    URL_SESSIONTOKEN = "/json/system/loginApplication?loginToken={apptoken}"
+
+    # session tokens time out 60 seconds after the last request
+    TOKEN_LIFETIME = 60
+    # refresh the token this many seconds before it would time out
+    REFRESH_MARGIN = 10
+
+    def __init__(self, handler: DSRequestHandler, apptoken: str):
+        self._handler = handler
+        self._apptoken = apptoken
+
+        self._token = None
+        self._expires = 0.0
+        self._refresh = None
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def refreshes(self) -> int:
+        return self._handler.metrics.token_refreshes
+
+    def is_valid(self) -> bool:
+        """
+        check if the current token can still be used without running into
+        the server side timeout
+        """
+        return (
+            self._token is not None
+            and time.monotonic() < self._expires - self.REFRESH_MARGIN
+        )
+
+    def touch(self) -> None:
+        """
+        the server extends the token lifetime with every request, so call
+        this whenever the token is used
+        """
+        self._expires = time.monotonic() + self.TOKEN_LIFETIME
+
+    def invalidate(self, token: str = None) -> None:
+        """
+        drop the current token, e.g. after the server rejected it
+
+        :param token: only drop the token if it is still the given one, so a
+            late failure doesn't throw away a token refreshed in the meantime
+        """
+        if token is None or token == self._token:
+            self._token = None
+            self._expires = 0.0
+
+    async def get_token(self) -> str:
+        """
+        get a valid session token, log in again if it is about to time out
+        """
+        if self.is_valid():
+            return self._token
+        return await self.refresh()
+
+    async def refresh(self) -> str:
+        """
+        log in and get a fresh session token, concurrent callers share one
+        in-flight login request instead of each starting their own
+        """
+        if self._refresh is None:
+            self._refresh = asyncio.ensure_future(self._login())
+        # shield the shared login so one cancelled caller doesn't cancel it
+        # for everybody else waiting on it
+        return await asyncio.shield(self._refresh)
+
+    async def _login(self) -> str:
+        try:
+            _LOGGER.debug("Requesting new session token")
+            data = await self._handler.raw_request(
+                self.URL_SESSIONTOKEN.format(apptoken=self._apptoken)
+            )
+            if "result" not in data or "token" not in data["result"]:
+                raise DSException("invalid api response")
+
+            self._token = data["result"]["token"]
+            self.touch()
+            self._handler.metrics.token_refreshes += 1
+            return self._token
+        finally:
+            self._refresh = None
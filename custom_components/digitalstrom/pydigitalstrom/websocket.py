@@ -1,71 +1,281 @@
 import aiohttp
 import asyncio
-import json
+import random
 import time
 
+from . import codec
 from .client import DSClient
+from .events import DSEvent
+from .exceptions import DSException
 from .log import DSLog
 
+STATE_STOPPED = "stopped"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_DISCONNECTED = "disconnected"
+
 
 class DSWebsocketEventListener:
-    def __init__(self, client: DSClient, event_name: str):
+    # seconds to wait before reconnecting, doubled after every failed attempt
+    RECONNECT_INTERVAL = 1
+    RECONNECT_MAX_INTERVAL = 300
+
+    def __init__(self, client: DSClient, keepalive_timeout: int = 180):
+        """
+        :param client: client to connect with
+        :param keepalive_timeout: seconds without a keepWebserviceAlive event
+            after which the connection is considered dead
+        """
         self._client = client
-        self._event_name = event_name
-        self._callbacks = []
+        self._keepalive_timeout = keepalive_timeout
+
+        # handlers of every subscribed event type, {event_name: []}
+        self._handlers = dict()
+
+        # callScene events are only passed to the callbacks registered for
+        # their zone and group or zone and scene, {group_id: {zone_id: []}}
+        self._group_callbacks = dict()
+        self._scene_callbacks = dict()
 
         self._ws = None
+        self._task = None
         self._last_keepalive = None
 
-    def register(self, callback: callable):
-        self._callbacks.append(callback)
+        self.state = STATE_STOPPED
+
+    @property
+    def reconnects(self) -> int:
+        return self._client.metrics.websocket_reconnects
+
+    @property
+    def connected(self) -> bool:
+        return self.state == STATE_CONNECTED
+
+    @property
+    def last_keepalive(self):
+        """
+        monotonic time of the last keepWebserviceAlive event
+        """
+        return self._last_keepalive
+
+    @property
+    def event_names(self) -> list:
+        """
+        names of the events with at least one handler
+        """
+        return [name for name, handlers in self._handlers.items() if handlers]
+
+    def subscribe(self, event_name: str, callback: callable) -> callable:
+        """
+        get notified of all events of a type, can be called at any time
+
+        :param event_name: name of the events, e.g. callScene or undoScene
+        :param callback: coroutine function called with the parsed event
+        :return: function to unsubscribe the callback again
+        """
+        self._handlers.setdefault(event_name, []).append(callback)
+        return lambda: self.unsubscribe(event_name=event_name, callback=callback)
+
+    def unsubscribe(self, event_name: str, callback: callable) -> None:
+        handlers = self._handlers.get(event_name, [])
+        if callback in handlers:
+            handlers.remove(callback)
+        if not handlers:
+            self._handlers.pop(event_name, None)
+
+    def register_group(self, zone_id: int, group_id: int, callback: callable) -> callable:
+        """
+        get notified of callScene events for a group in a zone, calls for the whole
+        apartment (zone 0) are passed to every zone
+
+        :param zone_id: zone to get the events of
+        :param group_id: group (color) to get the events of
+        :param callback: coroutine function called with the parsed event
+        :return: function to unregister the callback again
+        """
+        return self._add_indexed(self._group_callbacks, zone_id, group_id, callback)
+
+    def register_scene(self, zone_id: int, scene_id: int, callback: callable) -> callable:
+        """
+        get notified when a scene is called in a zone, calls for the whole
+        apartment (zone 0) are passed to every zone
+
+        :param zone_id: zone to get the events of
+        :param scene_id: scene to get the events of
+        :param callback: coroutine function called with the parsed event
+        :return: function to unregister the callback again
+        """
+        return self._add_indexed(self._scene_callbacks, zone_id, scene_id, callback)
+
+    @staticmethod
+    def _add_indexed(index: dict, zone_id: int, key: int, callback: callable) -> callable:
+        zones = index.setdefault(key, dict())
+        callbacks = zones.setdefault(zone_id, [])
+        callbacks.append(callback)
+
+        def remove():
+            callbacks.remove(callback)
+            if not callbacks and zones.get(zone_id) is callbacks:
+                del zones[zone_id]
+                if not zones and index.get(key) is zones:
+                    del index[key]
+
+        return remove
+
+    @staticmethod
+    def _get_indexed(index: dict, event: DSEvent, key: int) -> list:
+        zones = index.get(key)
+        if not zones:
+            return []
+        if event.is_broadcast:
+            return [callback for callbacks in zones.values() for callback in callbacks]
+        return list(zones.get(event.zone_id, []))
 
     async def _get_cookie(self):
-        return dict(token=await self._client.get_session_token())
+        # a dropped connection often means a dropped session, so always
+        # connect with a fresh token
+        return dict(token=await self._client.tokens.refresh())
 
     async def start(self):
         DSLog.logger.debug(f"DSWebsocketEventListener start")
-        session = await self._client.get_aiohttp_session(
-            cookies=await self._get_cookie()
-        )
-        url = f"wss://{self._client.host}:{self._client.port}/websocket"
-        
-        self._ws = session.ws_connect(url=url)
-        async with self._ws as ws:
-            DSLog.logger.debug(f"WS connected")
-            async for msg in ws:
-                DSLog.logger.debug(f"New WS message")
-                if msg.type in (aiohttp.WSMsgType.TEXT,
-                                aiohttp.WSMsgType.CLOSED,
-                                aiohttp.WSMsgType.ERROR):
-
-                    if msg.type in (aiohttp.WSMsgType.CLOSED,
-                                    aiohttp.WSMsgType.ERROR):
-                        DSLog.logger.warn(f"DS websocket closed or error: {msg}")
-                        break
-
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        await self._handle_event(event=json.loads(msg.data))
-                else:
-                    DSLog.logger.warn(f"DS websocket got unknown command: {msg}")
+        self._task = asyncio.Task(self._supervise())
 
     async def stop(self):
-
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
 
         if self._ws is not None:
             await self._ws.close()
             self._ws = None
 
+        self.state = STATE_STOPPED
+
+    async def _supervise(self):
+        """
+        keep the websocket connected, reconnect with a jittered exponential
+        backoff whenever the connection drops or can't be established
+        """
+        interval = self.RECONNECT_INTERVAL
+        while True:
+            try:
+                if await self._connect():
+                    # the connection was up, start over with a short delay
+                    interval = self.RECONNECT_INTERVAL
+            except (aiohttp.ClientError, asyncio.TimeoutError, DSException) as e:
+                DSLog.logger.warning(f"DS websocket connection failed: {e!r}")
+            except Exception:
+                # never give up on the connection, whatever went wrong
+                DSLog.logger.exception("DS websocket failed unexpectedly")
+            finally:
+                # stop() sets the state on its own
+                if self.state != STATE_STOPPED:
+                    self.state = STATE_DISCONNECTED
+
+            delay = interval * random.uniform(0.5, 1.0)
+            DSLog.logger.info(f"DS websocket reconnecting in {delay:.1f} seconds")
+            await asyncio.sleep(delay)
+            interval = min(interval * 2, self.RECONNECT_MAX_INTERVAL)
+            self._client.metrics.websocket_reconnects += 1
+
+    async def _connect(self) -> bool:
+        """
+        connect and handle messages until the connection is closed or the
+        server stops sending keep alive events
+
+        :return: if the connection was established
+        """
+        self.state = STATE_CONNECTING
+        session = await self._client.get_session()
+        cookie = "; ".join(
+            f"{name}={value}" for name, value in (await self._get_cookie()).items()
+        )
+        url = f"wss://{self._client.host}:{self._client.port}/websocket"
+
+        try:
+            # get text frames as bytes to decode them without a str copy
+            connection = session.ws_connect(
+                url=url, headers={"Cookie": cookie}, decode_text=False
+            )
+        except TypeError:
+            # older aiohttp versions always decode text frames
+            connection = session.ws_connect(url=url, headers={"Cookie": cookie})
+
+        async with connection as ws:
+            DSLog.logger.debug(f"WS connected")
+            self._ws = ws
+            self.state = STATE_CONNECTED
+            self._last_keepalive = time.monotonic()
+            try:
+                await self._receive(ws=ws)
+            finally:
+                self._ws = None
+        return True
+
+    async def _receive(self, ws: aiohttp.ClientWebSocketResponse):
+        while True:
+            timeout = self._last_keepalive + self._keepalive_timeout - time.monotonic()
+            try:
+                msg = await ws.receive(timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                DSLog.logger.warning(
+                    f"DS websocket got no keep alive for {self._keepalive_timeout} seconds"
+                )
+                return
+
+            DSLog.logger.debug(f"New WS message")
+            if msg.type in (aiohttp.WSMsgType.CLOSE,
+                            aiohttp.WSMsgType.CLOSING,
+                            aiohttp.WSMsgType.CLOSED,
+                            aiohttp.WSMsgType.ERROR):
+                DSLog.logger.warning(f"DS websocket closed or error: {msg}")
+                return
+
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                try:
+                    event = codec.loads(msg.data)
+                except codec.DecodeError:
+                    DSLog.logger.warning(f"DS websocket got invalid json: {msg.data!r}")
+                    continue
+                await self._handle_event(event=event)
+            else:
+                DSLog.logger.warning(f"DS websocket got unknown command: {msg}")
+
     async def _handle_event(self, event: dict):
 
-        DSLog.logger.debug("WS Event {event}")
+        DSLog.logger.debug(f"WS Event {event}")
 
-        if "name" not in event:
+        # parse the event once for all handlers
+        event = DSEvent.from_dict(event)
+        if event is None:
             return
 
-        if event["name"] == "keepWebserviceAlive":
-            self._last_keepalive = time.time() * 1000.0
+        if event.name == "keepWebserviceAlive":
+            self._last_keepalive = time.monotonic()
+        else:
+            self._client.metrics.events.mark()
+
+        for callback in list(self._handlers.get(event.name, [])):
+            await self._run_callback(callback, event)
+
+        # pass scene calls only to the affected callbacks
+        if event.name != "callScene" or event.zone_id is None:
+            return
+
+        callbacks = []
+        if event.group_id is not None:
+            callbacks += self._get_indexed(self._group_callbacks, event, event.group_id)
+        if event.scene_id is not None:
+            callbacks += self._get_indexed(self._scene_callbacks, event, event.scene_id)
+
+        for callback in callbacks:
+            await self._run_callback(callback, event)
 
-        # subscribed event
-        if event["name"] == self._event_name:
-            for callback in self._callbacks:
-                await callback(event=event)
+    @staticmethod
+    async def _run_callback(callback: callable, event: DSEvent) -> None:
+        # a failing callback must neither keep the others from getting the
+        # event nor take down the connection
+        try:
+            await callback(event=event)
+        except Exception:
+            DSLog.logger.exception(f"DS websocket callback failed on {event!r}")
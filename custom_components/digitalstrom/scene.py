@@ -13,7 +13,7 @@ from .pydigitalstrom import constants as dsconst
 from .pydigitalstrom.devices.scene import DSScene, DSColorScene
 
 from .const import DOMAIN
-from .util import slugify_entry
+from .util import slugify_entry, async_setup_topology_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -36,71 +36,74 @@ async def async_setup_entry(
     )
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
-    scenes: list = []
-
-    scene: Union[DSScene, DSColorScene]
-    for scene in client.get_scenes().values():
-        # only color scenes have a special check
-        if isinstance(scene, DSColorScene):
-            # area and broadcast scenes (yellow/1 and grey/2 up to id 9)
-            # shouldn't be added since they'll be processed as
-            # lights and covers
-            if scene.color in (constants.GROUP_LIGHTS, constants.GROUP_BLINDS) and scene.scene_id <= 9:
-                continue
 
-            # Preset X2-X4 are handled with Effects
-            if scene.color == constants.GROUP_LIGHTS and scene.scene_id in [
-                dsconst.SCENES["PRESET"]["SCENE_PRESET2"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET3"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET4"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET12"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET13"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET14"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET22"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET23"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET24"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET32"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET33"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET34"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET42"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET43"],
-                dsconst.SCENES["PRESET"]["SCENE_PRESET44"],
+    def build_entities() -> list:
+        scenes: list = []
+
+        scene: Union[DSScene, DSColorScene]
+        for scene in client.get_scenes().values():
+            # only color scenes have a special check
+            if isinstance(scene, DSColorScene):
+                # area and broadcast scenes (yellow/1 and grey/2 up to id 9)
+                # shouldn't be added since they'll be processed as
+                # lights and covers
+                if scene.color in (constants.GROUP_LIGHTS, constants.GROUP_BLINDS) and scene.scene_id <= 9:
+                    continue
+
+                # Preset X2-X4 are handled with Effects
+                if scene.color == constants.GROUP_LIGHTS and scene.scene_id in [
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET2"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET3"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET4"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET12"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET13"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET14"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET22"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET23"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET24"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET32"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET33"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET34"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET42"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET43"],
+                    dsconst.SCENES["PRESET"]["SCENE_PRESET44"],
+                    ]:
+                    continue
+
+            # Ignore never used scenes
+            if scene.scene_id in [
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_DEEP_OFF"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_STANDBY"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ZONE_ACTIVE"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_AUTO_STANDBY"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ABSENT"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_PRESENT"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_SLEEPING"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_WAKEUP"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_DOOR_BELL"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_PANIC"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_FIRE"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_1"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_2"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_3"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_4"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_WIND"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_NO_WIND"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_RAIN"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_NO_RAIN"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_HAIL"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_NO_HAIL"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_POLLUTION"],
+                dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_BURGLARY"]
                 ]:
                 continue
 
-        # Ignore never used scenes
-        if scene.scene_id in [
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_DEEP_OFF"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_STANDBY"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ZONE_ACTIVE"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_AUTO_STANDBY"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ABSENT"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_PRESENT"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_SLEEPING"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_WAKEUP"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_DOOR_BELL"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_PANIC"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_FIRE"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_1"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_2"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_3"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_ALARM_4"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_WIND"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_NO_WIND"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_RAIN"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_NO_RAIN"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_HAIL"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_NO_HAIL"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_POLLUTION"],
-            dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_BURGLARY"]
-            ]:
-            continue
-
-        _LOGGER.info(f"adding scene {scene.scene_id}: {scene.name}")
-        scenes.append(DigitalstromScene(scene=scene, config_entry=entry))
-
-    scene: DigitalstromScene
-    async_add_entities(scene for scene in scenes)
+            _LOGGER.info(f"adding scene {scene.scene_id}: {scene.name}")
+            scenes.append(DigitalstromScene(scene=scene, config_entry=entry))
+
+        return scenes
+
+    await async_setup_topology_entities(hass, entry, async_add_entities, build_entities)
 
 
 class DigitalstromScene(Scene):
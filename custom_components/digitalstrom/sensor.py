@@ -4,19 +4,59 @@ from typing import Callable, Union
 
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfPower, UnitOfEnergy, CONF_HOST, CONF_PORT
+from homeassistant.const import (
+    UnitOfPower,
+    UnitOfEnergy,
+    UnitOfTime,
+    EntityCategory,
+    CONF_HOST,
+    CONF_PORT,
+)
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.core import HomeAssistant
 from .pydigitalstrom.client import DSClient
 from .pydigitalstrom.devices.meter import DSMeter
+from .pydigitalstrom.metercoordinator import DSMeterCoordinator
+from .pydigitalstrom.metrics import DSMetrics
 from homeassistant.util import dt
 
 
 from .const import DOMAIN
-from .util import slugify_entry
+from .util import slugify_entry, async_setup_topology_entities
 
 _LOGGER = logging.getLogger(__name__)
 
+# diagnostic sensors of the communication with the server
+# key, name, unit, state class, value
+METRIC_SENSORS = (
+    (
+        "request_latency",
+        "Request Latency",
+        UnitOfTime.MILLISECONDS,
+        "measurement",
+        lambda metrics: metrics.request_latency,
+    ),
+    ("request_retries", "Request Retries", None, "total_increasing", lambda metrics: metrics.retries),
+    ("request_failures", "Request Failures", None, "total_increasing", lambda metrics: metrics.failures),
+    ("queue_depth", "Command Queue Depth", None, "measurement", lambda metrics: metrics.queue_depth),
+    (
+        "queue_wait",
+        "Command Queue Wait",
+        UnitOfTime.MILLISECONDS,
+        "measurement",
+        lambda metrics: metrics.queue_wait.mean,
+    ),
+    ("token_refreshes", "Token Refreshes", None, "total_increasing", lambda metrics: metrics.token_refreshes),
+    (
+        "websocket_reconnects",
+        "Websocket Reconnects",
+        None,
+        "total_increasing",
+        lambda metrics: metrics.websocket_reconnects,
+    ),
+    ("websocket_events", "Websocket Events", "events/s", "measurement", lambda metrics: metrics.events.rate),
+)
+
 
 async def async_setup_platform(
     hass: HomeAssistant,
@@ -39,27 +79,44 @@ async def async_setup_entry(
     )
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
-    
-    devices: dict = []
-    meters: dict = client.get_meters()
-
-    meter: DSMeter
-    for meter in meters.values():
-        # add meter
-        _LOGGER.info(f"adding meter {meter.name}")
-        devices.append(
-            DigitalstromConsumptionMeter(
-                hass=hass, dsmeter=meter
+
+    def build_entities() -> list:
+        devices: dict = []
+        meters: dict = client.get_meters()
+
+        meter: DSMeter
+        for meter in meters.values():
+            # add meter
+            _LOGGER.info(f"adding meter {meter.name}")
+            devices.append(
+                DigitalstromConsumptionMeter(
+                    hass=hass, dsmeter=meter, metering=client.metering
+                )
             )
-        )
-        devices.append(
-            DigitalstromEnergyMeter(
-                hass=hass, dsmeter=meter
+            devices.append(
+                DigitalstromEnergyMeter(
+                    hass=hass, dsmeter=meter, metering=client.metering
+                )
             )
-        )
 
-    device: Union[DigitalstromConsumptionMeter,DigitalstromEnergyMeter]
-    async_add_entities(device for device in devices)
+        # diagnostic sensors, disabled by default
+        for key, name, unit, state_class, value in METRIC_SENSORS:
+            devices.append(
+                DigitalstromMetricSensor(
+                    entry_slug=entry_slug,
+                    host=client.host,
+                    metrics=client.metrics,
+                    key=key,
+                    name=name,
+                    unit=unit,
+                    state_class=state_class,
+                    value=value,
+                )
+            )
+
+        return devices
+
+    await async_setup_topology_entities(hass, entry, async_add_entities, build_entities)
 
 
 class DigitalstromConsumptionMeter(SensorEntity):
@@ -67,11 +124,13 @@ class DigitalstromConsumptionMeter(SensorEntity):
         self,
         hass: HomeAssistant,
         dsmeter: DSMeter,
+        metering: DSMeterCoordinator,
         *args,
         **kwargs,
     ):
         self._hass: HomeAssistant = hass
         self._dsmeter: DSMeter = dsmeter
+        self._metering: DSMeterCoordinator = metering
         self._state: int = None
         super().__init__(*args, **kwargs)
 
@@ -86,7 +145,7 @@ class DigitalstromConsumptionMeter(SensorEntity):
 
     @property
     def available(self) -> bool:
-        return True
+        return self._dsmeter.available
 
     @property
     def state(self) -> int:
@@ -115,19 +174,39 @@ class DigitalstromConsumptionMeter(SensorEntity):
             "manufacturer": "digitalSTROM AG",
         }
 
-    async def async_update(self, **kwargs) -> None:
-        self._state = await self._dsmeter.get_latest()
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+
+        # values are polled for all meters at once by the coordinator
+        self._state = self._metering.get_value(
+            dsuid=self._dsmeter.dsuid, type="consumption"
+        )
+        self.async_on_remove(
+            self._metering.register(
+                dsuid=self._dsmeter.dsuid, type="consumption", callback=self.value_changed
+            )
+        )
+
+    async def value_changed(self, value: int) -> None:
+        self._state = value
+        self.async_write_ha_state()
 
 class DigitalstromEnergyMeter(SensorEntity):
     def __init__(
         self,
         hass: HomeAssistant,
         dsmeter: DSMeter,
+        metering: DSMeterCoordinator,
         *args,
         **kwargs,
     ):
         self._hass: HomeAssistant = hass
         self._dsmeter: DSMeter = dsmeter
+        self._metering: DSMeterCoordinator = metering
         self._state: int = None
         super().__init__(*args, **kwargs)
 
@@ -142,7 +221,7 @@ class DigitalstromEnergyMeter(SensorEntity):
 
     @property
     def available(self) -> bool:
-        return True
+        return self._dsmeter.available
 
     @property
     def last_reset(self):
@@ -175,5 +254,103 @@ class DigitalstromEnergyMeter(SensorEntity):
             "manufacturer": "digitalSTROM AG",
         }
 
-    async def async_update(self, **kwargs) -> None:
-        self._state = await self._dsmeter.get_latest_energy()
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+
+        # values are polled for all meters at once by the coordinator
+        self._state = self._metering.get_value(
+            dsuid=self._dsmeter.dsuid, type="energy"
+        )
+        self.async_on_remove(
+            self._metering.register(
+                dsuid=self._dsmeter.dsuid, type="energy", callback=self.value_changed
+            )
+        )
+
+    async def value_changed(self, value: int) -> None:
+        self._state = value
+        self.async_write_ha_state()
+
+
+class DigitalstromMetricSensor(SensorEntity):
+    def __init__(
+        self,
+        entry_slug: str,
+        host: str,
+        metrics: DSMetrics,
+        key: str,
+        name: str,
+        unit: str,
+        state_class: str,
+        value: Callable,
+        *args,
+        **kwargs,
+    ):
+        self._entry_slug: str = entry_slug
+        self._host: str = host
+        self._metrics: DSMetrics = metrics
+        self._key: str = key
+        self._name: str = name
+        self._unit: str = unit
+        self._state_class: str = state_class
+        self._value: Callable = value
+        self._state = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def name(self) -> str:
+        return f"digitalSTROM {self._name}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"dsmetric_{self._entry_slug}_{self._key}"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def state(self):
+        if isinstance(self._state, float):
+            return round(self._state, 2)
+        return self._state
+
+    @property
+    def state_class(self):
+        return self._state_class
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit the value is expressed in."""
+        return self._unit
+
+    @property
+    def entity_category(self):
+        return EntityCategory.DIAGNOSTIC
+
+    @property
+    def entity_registry_enabled_default(self) -> bool:
+        return False
+
+    @property
+    def device_info(self) -> dict:
+        """Return information about the device."""
+        return {
+            "identifiers": {(DOMAIN, self._entry_slug)},
+            "name": f"digitalSTROM Server ({self._host})",
+            "model": "dSS",
+            "manufacturer": "digitalSTROM AG",
+        }
+
+    @property
+    def should_poll(self) -> bool:
+        # the metrics are updated with every request, polling them is
+        # cheaper than writing the state that often
+        return True
+
+    async def async_update(self) -> None:
+        self._state = self._value(self._metrics)
@@ -11,10 +11,11 @@ from homeassistant.core import HomeAssistant
 from .pydigitalstrom.client import DSClient
 from .pydigitalstrom import constants as dsconst
 from .pydigitalstrom.devices.scene import DSScene, DSColorScene
+from .pydigitalstrom.events import DSEvent
 from .pydigitalstrom.websocket import DSWebsocketEventListener
 
 from .const import DOMAIN
-from .util import slugify_entry
+from .util import slugify_entry, async_setup_topology_entities, get_state_delay, DSStateWriter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,36 +39,34 @@ async def async_setup_entry(
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
     listener: DSWebsocketEventListener = hass.data[DOMAIN][entry_slug]["listener"]
-    devices: list = []
-    scenes: dict = client.get_scenes()
-
-    scene: Union[DSScene, DSColorScene]
-    for scene in scenes.values():
-        # only handle scenes
-        if not isinstance(scene, DSScene):
-            continue
-        # only sleeping and present
-        if scene.scene_id not in [dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_SLEEPING"], dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_PRESENT"] ]:
-            continue
-
-        # get turn on counterpart
-        scene_off: DSScene = scenes.get(
-            f"{scene.zone_id}_{scene.scene_id + 1}", None,
-        )
 
-        # no turn off scene found, skip
-        if not scene_off:
-            continue
+    def build_entities() -> list:
+        devices: list = []
+        apartment = client.apartment
 
-        # add sensors
-        devices.append(
-            DigitalstromSwitch(
-                hass=hass, scene_on=scene, scene_off=scene_off, listener=listener
-            )
-        )
+        for zone in apartment.zones.values():
+            # only sleeping and present
+            for scene_id in dsconst.SCENE_STATE_PAIRS:
+                # get turn off counterpart, skip if there is none
+                pair = apartment.get_state_pair(zone_id=zone.zone_id, scene_id=scene_id)
+                if not pair:
+                    continue
+                scene, scene_off = pair
+
+                # add switch
+                devices.append(
+                    DigitalstromSwitch(
+                        hass=hass,
+                        scene_on=scene,
+                        scene_off=scene_off,
+                        listener=listener,
+                        state_delay=get_state_delay(entry),
+                    )
+                )
 
-    device: DigitalstromSwitch
-    async_add_entities(device for device in devices)
+        return devices
+
+    await async_setup_topology_entities(hass, entry, async_add_entities, build_entities)
 
 
 class DigitalstromSwitch(RestoreEntity, SwitchEntity):
@@ -77,6 +76,7 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
         scene_on: DSScene,
         scene_off: DSScene,
         listener: DSWebsocketEventListener,
+        state_delay: float = 0,
         *args,
         **kwargs,
     ):
@@ -85,6 +85,7 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
         self._scene_off: DSScene = scene_off
         self._listener: DSWebsocketEventListener = listener
         self._state: bool = None
+        self._state_writer = DSStateWriter(entity=self, delay=state_delay)
 
         # sleeping default is false
         if self._scene_on.scene_id == dsconst.SCENES["GROUP_INDIPENDENT"]["SCENE_SLEEPING"]:
@@ -94,42 +95,33 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
             self._state = True
         super().__init__(*args, **kwargs)
 
-        self.register_callback()
-
     def register_callback(self) -> None:
-        async def event_callback(event: dict):
-            # sanity checks
-            if "name" not in event:
-                return
-            if event["name"] != "callScene":
-                return
-            if "properties" not in event:
-                return
-            if "sceneID" not in event["properties"]:
-                return
-            if "zoneID" not in event["properties"]:
-                return
-
-            # cast event data
-            zone_id: int = int(event["properties"]["zoneID"])
-            scene_id: int = int(event["properties"]["sceneID"])
-
-            # turn on scene called
-            if (
-                self._scene_on.zone_id == zone_id
-                and self._scene_on.scene_id == scene_id
-            ):
-                self._state = True
-                await self.async_update_ha_state()
-            # turn off scene called
-            elif (
-                self._scene_off.zone_id == zone_id
-                and self._scene_off.scene_id == scene_id
-            ):
-                self._state = False
-                await self.async_update_ha_state()
-
-        self._listener.register(callback=event_callback)
+        # turn on scene called
+        async def turn_on_callback(event: DSEvent):
+            self._state = True
+            self._state_writer.schedule()
+
+        # turn off scene called
+        async def turn_off_callback(event: DSEvent):
+            self._state = False
+            self._state_writer.schedule()
+
+        self.async_on_remove(self._state_writer.cancel)
+        # the listener only passes calls of these scenes in the zone
+        self.async_on_remove(
+            self._listener.register_scene(
+                zone_id=self._scene_on.zone_id,
+                scene_id=self._scene_on.scene_id,
+                callback=turn_on_callback,
+            )
+        )
+        self.async_on_remove(
+            self._listener.register_scene(
+                zone_id=self._scene_off.zone_id,
+                scene_id=self._scene_off.scene_id,
+                callback=turn_off_callback,
+            )
+        )
 
     @property
     def name(self) -> str:
@@ -141,7 +133,7 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
 
     @property
     def available(self) -> bool:
-        return True
+        return self._scene_on.available
 
     @property
     def is_on(self) -> bool:
@@ -157,6 +149,8 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
+        self.register_callback()
+
         state: bool = await self.async_get_last_state()
         if not state:
             return
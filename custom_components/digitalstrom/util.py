@@ -1,7 +1,134 @@
+from typing import Callable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.storage import Store
 from homeassistant.util import slugify
 
-from .const import SLUG_FORMAT
+from .const import (
+    SLUG_FORMAT,
+    SIGNAL_TOPOLOGY_UPDATED,
+    SIGNAL_AVAILABILITY_UPDATED,
+    CONF_STATE_DELAY,
+    DEFAULT_STATE_DELAY,
+)
 
 
 def slugify_entry(host, port):
     return slugify(SLUG_FORMAT.format(host=host, port=port))
+
+
+class DSTopologyStore(Store):
+    """
+    cached topology of a server, topologies of older versions are dropped
+    and fetched from the server again
+    """
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        return None
+
+
+def get_state_delay(entry: ConfigEntry) -> float:
+    """
+    seconds to coalesce state writes of the entities of an entry
+    """
+    return entry.data.get(CONF_STATE_DELAY, DEFAULT_STATE_DELAY) / 1000
+
+
+class DSStateWriter:
+    """
+    write the state of an entity at most once per window, so a burst of
+    events (e.g. an apartment wide scene call) only records the final state
+    """
+
+    def __init__(self, entity: Entity, delay: float):
+        """
+        :param entity: entity to write the state of
+        :param delay: seconds to collect state changes, 0 writes immediately
+        """
+        self._entity = entity
+        self._delay = delay
+        self._handle = None
+
+    @callback
+    def schedule(self) -> None:
+        if self._delay <= 0:
+            self._entity.async_write_ha_state()
+            return
+
+        # a write is pending already and will pick up the latest state
+        if self._handle is not None:
+            return
+        self._handle = self._entity.hass.loop.call_later(self._delay, self._write)
+
+    @callback
+    def _write(self) -> None:
+        self._handle = None
+        self._entity.async_write_ha_state()
+
+    @callback
+    def cancel(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+async def async_setup_topology_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: Callable,
+    build_entities: Callable,
+) -> None:
+    """
+    add the entities build_entities creates from the current topology and
+    keep them in sync when the topology of the server changes later on,
+    entities are matched by unique id so unchanged ones are left alone.
+    their state is written again when the server becomes unavailable or
+    available again
+    """
+    entry_slug: str = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
+    entities: dict = dict()
+
+    @callback
+    def async_update_entities() -> None:
+        current: dict = {entity.unique_id: entity for entity in build_entities()}
+
+        # remove entities that are gone on the server
+        registry = entity_registry.async_get(hass)
+        for unique_id in [unique_id for unique_id in entities if unique_id not in current]:
+            entity = entities.pop(unique_id)
+            if entity.entity_id and registry.async_get(entity.entity_id):
+                registry.async_remove(entity.entity_id)
+            else:
+                hass.async_create_task(entity.async_remove())
+
+        # add entities that are new on the server
+        new_entities: list = [
+            entity for unique_id, entity in current.items() if unique_id not in entities
+        ]
+        for entity in new_entities:
+            entities[entity.unique_id] = entity
+        if new_entities:
+            async_add_entities(new_entities)
+
+    @callback
+    def async_update_availability() -> None:
+        for entity in entities.values():
+            if entity.hass is not None and entity.entity_id:
+                entity.async_write_ha_state()
+
+    async_update_entities()
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_TOPOLOGY_UPDATED.format(slug=entry_slug), async_update_entities
+        )
+    )
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_AVAILABILITY_UPDATED.format(slug=entry_slug), async_update_availability
+        )
+    )